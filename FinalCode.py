@@ -9,12 +9,21 @@ Data Preparation Steps:
 3. Create interactive dashboard for analysis
 """
 
+import os
+import time
+
+# Startup timings, reported at /metrics (see warm_up below)
+PROCESS_START = time.time()
+
 # Part 1: Install required packages for Google Colab
 try:
     import google.colab
     IN_COLAB = True
     print("Running in Google Colab...")
-    !pip install dash==2.9.3 dash-bootstrap-components==1.4.1 plotly==5.13.1 jupyter-dash==0.4.2
+    import subprocess, sys
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-q',
+                           'dash==2.9.3', 'dash-bootstrap-components==1.4.1',
+                           'plotly==5.13.1', 'jupyter-dash==0.4.2'])
     from google.colab import files
     import nest_asyncio
     nest_asyncio.apply()
@@ -23,11 +32,30 @@ except:
     print("Not running in Google Colab")
 
 # Part 2: Import required libraries
+# plotly.express and jupyter_dash are slow to import and imported where they
+# are first used, so server start-up does not pay for them
 import pandas as pd
-import plotly.express as px
-from dash import Dash, dcc, html, Input, Output
+import plotly.graph_objects as go
+import plotly.io as pio
+from dash import Dash, dcc, html, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from jupyter_dash import JupyterDash
+from flask import request
+
+from dataset_store import DatasetStore, file_version
+from snapshot import write_snapshot
+from data_loader import clean_restaurants, load_restaurants
+from filter_index import FilterIndex, RATING_RANGES, normalize_selection
+from name_search import NameIndex
+from leaderboard import Leaderboard
+from snapshot_diff import SOURCES as SNAPSHOT_SOURCES, diff_snapshots, summarize
+from aggregate_cube import AggregateCube
+from callback_graph import CallbackGraph
+from caching import BoundedCache, VersionedCache, MISSING
+from ingest import apply_upserts, latest_rows, read_appended
+from geo import gazetteer
+from density import rating_histogram, review_rating_grid
+from metrics import metrics, prometheus_counters
 
 # Part 3: Data Merging
 def merge_csv_files():
@@ -40,20 +68,12 @@ def merge_csv_files():
             print("\nPlease upload 'restos_2025.csv'...")
             files.upload()
         
-        # Read both CSV files
-        df1 = pd.read_csv('restos (1).csv')
-        df2 = pd.read_csv('restos_2025.csv')
-        
-        # Concatenate the dataframes
-        combined_df = pd.concat([df1, df2], ignore_index=True)
+        # Read, combine and clean both CSV files into the typed schema
+        combined_df = load_restaurants(['restos (1).csv', 'restos_2025.csv'], report=True)
         
-        # Clean the data
-        combined_df = combined_df.dropna(subset=['FoodType'])
-        combined_df = combined_df.drop_duplicates()
-        combined_df['City'] = combined_df['City'].str.title()
-        
-        # Save the combined dataframe
+        # Save the combined dataframe, plus a columnar snapshot for fast loads
         combined_df.to_csv('FoodpandaCombo.csv', index=False)
+        write_snapshot(combined_df, 'FoodpandaCombo.csv', typed=True)
         print("CSV files merged successfully!")
         return combined_df
         
@@ -67,42 +87,87 @@ def merge_csv_files():
 
 # Part 4: Dashboard Setup
 # Load and process the data
-def load_data():
-    # Read the combined CSV file
-    df = pd.read_csv('FoodpandaCombo.csv')
-    
-    # Clean the data
-    df['City'] = df['City'].str.title()
-    df = df.dropna(subset=['FoodType'])
-    df = df.drop_duplicates()
+def clean_data(df):
+    # Clean the data and cast it to the shared typed schema
+    df = clean_restaurants(df)
     
-    return df
-
-# Add geospatial information
-city_coords = {
-    'Manila': (14.599512, 120.984222),
-    'Cebu City': (10.316720, 123.890710),
-    'Dagupan Pangasinan': (16.043000, 120.334000),
-    'Davao City Davao Del Sur': (7.207573, 125.395874),
-    'Koronadal South Cotabato': (6.497396, 124.847160),
-    'Lapu-Lapu City Cebu': (10.266182, 123.997292),
-    'Makati City': (14.556586, 121.023415),
-    'Malolos Bulacan': (14.852739, 120.816040),
-    'Mandaluyong City': (14.616700, 121.033300),
-    'Marikina': (14.637300, 121.091700),
-    'Muntinlupa City': (14.408133, 121.041466),
-    'Ormoc Leyte': (11.006390, 124.607500),
-    'Pasay City': (14.537752, 121.001381),
-    'Pasig City': (14.560500, 121.076500),
-    'Quezon City': (14.676208, 121.043861),
-    'San Juan': (14.604200, 121.029900),
-    'Taguig City': (14.517600, 121.050900),
-    'Valencia Bukidnon': (7.900000, 125.083333)
-}
+    # Rows appended by ingest.py supersede older rows of the same store
+    return latest_rows(df)
+
+def read_and_clean(path):
+    # Read the combined data (memory-mapping its snapshot when available)
+    # into the typed schema
+    return latest_rows(load_restaurants(path, report=True))
+
+def read_and_clean_appended(path, offset, df):
+    # Only parse the rows ingest.py appended after `offset`
+    delta = clean_data(read_appended(path, offset))
+    new_df, removed = apply_upserts(df, delta)
+    return new_df, delta, removed
+
+def create_dataset_store(path):
+    """Dataset holder for `path` with the indexes and aggregates the dashboard reads"""
+    store = DatasetStore(path, read_and_clean, append_loader=read_and_clean_appended)
+    store.register_artifact('filter_index', FilterIndex)
+    store.register_artifact('cube', AggregateCube)
+    store.register_artifact('city_coordinates', lambda df: gazetteer.city_table(df['City']))
+    store.register_artifact('name_search', NameIndex)
+    store.register_artifact('leaderboard', Leaderboard)
+    return store
+
+# The cleaned dataset is loaded once per process and reloaded in the
+# background whenever FoodpandaCombo.csv changes on disk
+dataset_store = create_dataset_store('FoodpandaCombo.csv')
+
+# Row selections of recent filter choices, kept on the server; the browser
+# only holds the key (dataset version + filters) in dcc.Store
+result_store = BoundedCache(max_entries=256, max_bytes=64 * 1024 * 1024, ttl=30 * 60)
+
+def result_key(version, city, food_type, rating_range):
+    """Key of a filter selection in result_store; JSON-friendly for dcc.Store"""
+    selections = [normalize_selection(value) for value in (city, food_type, rating_range)]
+    return {
+        'version': version,
+        'filters': [list(selected) if selected else None for selected in selections]
+    }
+
+def selection_tuple(key):
+    """Hashable (city, food_type, rating_range) selection of a result key"""
+    return tuple(tuple(f) if f else None for f in key['filters'])
+
+def cached_rows(snapshot, key):
+    """Row positions for a result key, from result_store or recomputed from the index"""
+    cache_key = (key['version'],) + selection_tuple(key)
+    rows = result_store.get(cache_key)
+    if rows is MISSING:
+        rows = snapshot.artifacts['filter_index'].rows(*key['filters'])
+        result_store.put(cache_key, rows)
+    return rows
+
+# Finished dashboard outputs (map, bar, histogram, density, stats) per filter selection.
+# Set INSIGHTPLATE_FIGURE_CACHE_DIR to a directory to keep them across restarts and workers.
+FIGURE_CACHE_DIR = os.environ.get('INSIGHTPLATE_FIGURE_CACHE_DIR') or None
+figure_cache = VersionedCache(max_entries=256, disk_dir=FIGURE_CACHE_DIR)
+
+def load_data():
+    """Return the current cleaned dataset without re-reading the CSV."""
+    return dataset_store.get().frame()
 
 # Create visualization functions
+# Figures carry only aggregated arrays (one point per city, bar or bin), and
+# use a slim template: plotly's default one is ~7.5 KB of per-trace, 3D and
+# polar defaults that were sent with every figure on every callback
+_default_layout = pio.templates['plotly'].layout.to_plotly_json()
+figure_template = go.layout.Template(layout={
+    key: _default_layout[key]
+    for key in ('autotypenumbers', 'colorway', 'font', 'hovermode', 'hoverlabel',
+                'coloraxis', 'xaxis', 'yaxis', 'title', 'mapbox')
+    if key in _default_layout
+})
+
 # Graph styling
 plot_layout = {
+    'template': figure_template,
     'paper_bgcolor': 'rgba(0,0,0,0)',
     'plot_bgcolor': 'rgba(0,0,0,0)',
     'font': {
@@ -142,21 +207,26 @@ plot_layout.update({
     }
 })
 
-def create_scatter_map(df):
-    # Add latitude and longitude to the dataframe
-    df['Latitude'] = df['City'].map(lambda x: city_coords.get(x, (None, None))[0])
-    df['Longitude'] = df['City'].map(lambda x: city_coords.get(x, (None, None))[1])
-    
-    # Create city-level aggregations
-    city_df = df.groupby('City').agg({
-        'AverageRating': 'mean',
-        'Reviewers': 'sum'
-    }).reset_index()
-    
-    city_df['Latitude'] = city_df['City'].map(lambda x: city_coords.get(x, (None, None))[0])
-    city_df['Longitude'] = city_df['City'].map(lambda x: city_coords.get(x, (None, None))[1])
+def create_empty_figure(message='No restaurants match these filters'):
+    """Blank figure with a centered note, for selections without data"""
+    fig = go.Figure()
+    fig.update_layout(
+        **plot_layout,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        annotations=[dict(text=message, showarrow=False, xref='paper', yref='paper',
+                          x=0.5, y=0.5, font=dict(color='white', size=14))]
+    )
+    return fig
+
+def create_scatter_map(city_df, coordinates):
+    # city_df holds one row per City with its mean AverageRating and total
+    # Reviewers, as returned by CubeSlice.by_city(); coordinates is the
+    # City-indexed Latitude/Longitude table built when the data was loaded
+    city_df = city_df.join(coordinates, on='City')
     
     # Create scatter map
+    import plotly.express as px
     fig = px.scatter_mapbox(
         city_df,
         lat='Latitude',
@@ -176,15 +246,14 @@ def create_scatter_map(df):
     
     return fig
 
-def create_food_type_distribution(df, city=None):
-    # Filter by city if specified
-    if city:
-        df = df[df['City'] == city]
-    
-    # Get food type distribution
-    food_type_counts = df['FoodType'].value_counts().head(10)
+def create_food_type_distribution(food_type_counts):
+    # Top 10 of the restaurant counts per food type (largest first)
+    food_type_counts = food_type_counts.head(10)
+    if food_type_counts.empty:
+        return create_empty_figure()
     
     # Create bar chart
+    import plotly.express as px
     fig = px.bar(
         x=food_type_counts.values,
         y=food_type_counts.index,
@@ -211,30 +280,32 @@ def create_food_type_distribution(df, city=None):
     
     return fig
 
-def create_rating_distribution(df, city=None):
-    # Filter by city if specified
-    if city:
-        df = df[df['City'] == city]
+def create_rating_distribution(counts, edges):
+    # Histogram binned on the server (see density.rating_histogram): only the
+    # bin counts are sent, as a bar trace
+    centers = (edges[:-1] + edges[1:]) / 2
     
     # Create histogram
-    fig = px.histogram(
-        df,
-        x='AverageRating',
-        nbins=20,
-        labels={'AverageRating': 'Average Rating', 'count': 'Number of Restaurants'},
-        color_discrete_sequence=['rgba(255,255,255,0.6)']
-    )
+    fig = go.Figure(go.Bar(
+        x=centers,
+        y=counts,
+        width=edges[1] - edges[0],
+        marker_color='rgba(255,255,255,0.6)',
+        hovertemplate='Rating: %{x:.2f}<br>Restaurants: %{y}<extra></extra>'
+    ))
     
     fig.update_layout(
         **plot_layout,
         bargap=0.1,
         xaxis=dict(
+            title='Average Rating',
             showgrid=True,
             gridwidth=1,
             gridcolor='rgba(255,255,255,0.1)',
             title_font=dict(color='white')
         ),
         yaxis=dict(
+            title='Number of Restaurants',
             showgrid=True,
             gridwidth=1,
             gridcolor='rgba(255,255,255,0.1)',
@@ -244,11 +315,51 @@ def create_rating_distribution(df, city=None):
     
     return fig
 
-def create_filter_options(df):
-    """Create options for filter dropdowns"""
-    cities = sorted(df['City'].unique())
-    food_types = sorted(df['FoodType'].unique())
-    rating_ranges = ['All', '4.5+', '4.0-4.4', '3.5-3.9', 'Below 3.5']
+def create_review_density(grid):
+    """Heatmap of a DensityGrid; the browser gets the fixed-size grid, not the rows"""
+    # Empty cells are left transparent
+    counts = grid.counts.astype('float64')
+    counts[counts == 0] = float('nan')
+    
+    fig = go.Figure(go.Heatmap(
+        z=counts,
+        x=grid.reviewer_labels(),
+        y=grid.rating_centers(),
+        colorscale='Viridis',
+        hovertemplate='Reviews: %{x}<br>Rating: %{y:.2f}<br>Restaurants: %{z}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        **plot_layout,
+        xaxis=dict(
+            title='Number of Reviews',
+            type='category',
+            showgrid=False,
+            title_font=dict(color='white')
+        ),
+        yaxis=dict(
+            title='Average Rating',
+            showgrid=False,
+            title_font=dict(color='white')
+        )
+    )
+    
+    return fig
+
+def create_filter_options(df, index=None, city_rows=None, food_type_rows=None):
+    """Create options for filter dropdowns
+    
+    With a FilterIndex the cities are read from the index for `city_rows`
+    and the food types for `food_type_rows` (row positions, None for all
+    rows) instead of scanning `df`.
+    """
+    if index is None:
+        cities = sorted(df['City'].unique())
+        food_types = sorted(df['FoodType'].unique())
+    else:
+        cities = index.present_values(city_rows)['City']
+        food_types = index.present_values(food_type_rows)['FoodType']
+    rating_ranges = ['All'] + list(RATING_RANGES)
     
     return {
         'cities': [{'label': city, 'value': city} for city in cities],
@@ -256,33 +367,154 @@ def create_filter_options(df):
         'rating_ranges': [{'label': rating, 'value': rating} for rating in rating_ranges]
     }
 
-def filter_dataframe(df, city=None, food_type=None, rating_range=None):
-    """Filter dataframe based on selected criteria"""
-    filtered_df = df.copy()
+def filter_dataframe(df, city=None, food_type=None, rating_range=None, index=None):
+    """Filter dataframe based on selected criteria
     
-    if city and city != 'All':
-        filtered_df = filtered_df[filtered_df['City'] == city]
-    
-    if food_type and food_type != 'All':
-        filtered_df = filtered_df[filtered_df['FoodType'] == food_type]
-    
-    if rating_range and rating_range != 'All':
-        if rating_range == '4.5+':
-            filtered_df = filtered_df[filtered_df['AverageRating'] >= 4.5]
-        elif rating_range == '4.0-4.4':
-            filtered_df = filtered_df[(filtered_df['AverageRating'] >= 4.0) & (filtered_df['AverageRating'] < 4.5)]
-        elif rating_range == '3.5-3.9':
-            filtered_df = filtered_df[(filtered_df['AverageRating'] >= 3.5) & (filtered_df['AverageRating'] < 4.0)]
-        else:  # Below 3.5
-            filtered_df = filtered_df[filtered_df['AverageRating'] < 3.5]
-    
-    return filtered_df
+    Each criterion may be a single value or a list of values (multi-select).
+    Pass the FilterIndex built for `df` to skip re-indexing it.
+    """
+    if index is None:
+        index = FilterIndex(df)
+    return index.select(df, city, food_type, rating_range)
+
+def create_stats(cube_slice):
+    """Build the Quick Stats panel from a CubeSlice"""
+    most_common = cube_slice.most_common_food_type or 'N/A'
+    mean_rating = cube_slice.mean_rating
+    # The mean is NaN when no restaurant in the selection is rated
+    mean_rating = 'N/A' if mean_rating != mean_rating else f"{mean_rating:.2f}"
+    return html.Div([
+        dbc.Row([
+            dbc.Col([
+                html.H5(f"Total Restaurants: {cube_slice.total}", className='mb-2'),
+                html.H5(f"Average Rating: {mean_rating}", className='mb-2'),
+                html.H5(f"Most Common Food Type: {most_common}", className='mb-2')
+            ])
+        ])
+    ])
+
+SEARCH_RESULTS = 20
+
+def create_search_results(df, rows):
+    """Build the search results table from matching row positions"""
+    if len(rows) == 0:
+        return html.P('No restaurants found', style={'opacity': '0.7'})
+    matches = df.iloc[rows]
+    header = html.Thead(html.Tr([html.Th(c) for c in ('Restaurant', 'City', 'Food Type', 'Rating', 'Reviewers')]))
+    body = html.Tbody([
+        html.Tr([
+            html.Td(row.CompleteStoreName if isinstance(row.CompleteStoreName, str) else row.StoreName),
+            html.Td(row.City),
+            html.Td(row.FoodType),
+            html.Td(f"{row.AverageRating:.1f}"),
+            html.Td(f"{row.Reviewers:,.0f}")
+        ])
+        for row in matches.itertuples()
+    ])
+    return dbc.Table([header, body], size='sm', borderless=True, style={'color': 'white', 'margin-bottom': '0'})
 
-# Initialize the Dash app
+LEADERBOARD_SIZE = 10
+LEADERBOARD_VIEWS = {'restaurant': 'Restaurants', 'City': 'Cities', 'FoodType': 'Cuisines'}
+
+def format_cell(column, value):
+    """Table text for one value; missing numbers show as '-'"""
+    if isinstance(value, float):
+        if value != value:
+            return '-'
+        # Scores of well-reviewed places differ in the third decimal
+        return f"{value:+.3f}" if column.endswith('Delta') else f"{value:.3f}" if column == 'Score' else f"{value:.2f}"
+    return f"{value:,}" if isinstance(value, int) else value
+
+def create_table(table, empty_message, ranked=False):
+    """Build a compact white table from a DataFrame, optionally numbering its rows"""
+    if table.empty:
+        return html.P(empty_message, style={'opacity': '0.7'})
+    rank_header = [html.Th('#')] if ranked else []
+    header = html.Thead(html.Tr(rank_header + [html.Th(c) for c in table.columns]))
+    body = html.Tbody([
+        html.Tr(([html.Td(rank)] if ranked else []) +
+                [html.Td(format_cell(column, value)) for column, value in zip(table.columns, row)])
+        for rank, row in enumerate(table.itertuples(index=False), start=1)
+    ])
+    return dbc.Table([header, body], size='sm', borderless=True, style={'color': 'white', 'margin-bottom': '0'})
+
+def create_leaderboard(table):
+    """Build the Top Rated table from a Leaderboard.top frame"""
+    return create_table(table, 'No restaurants with enough reviews', ranked=True)
+
+CHANGES_ROWS = 15
+CHANGES_VIEWS = {'City': 'Cities', 'FoodType': 'Cuisines'}
+
+# Store-level changes between the two source snapshots, recomputed only
+# when either file changes on disk
+snapshot_changes = VersionedCache(max_entries=1)
+
+def load_snapshot_changes():
+    """diff_snapshots of the source snapshots, or None when they are not available"""
+    try:
+        version = '|'.join(file_version(path) for path in SNAPSHOT_SOURCES)
+    except OSError:
+        return None
+    changes = snapshot_changes.get(version, 'changes')
+    if changes is MISSING:
+        changes = diff_snapshots(*(pd.read_csv(path, dtype=str) for path in SNAPSHOT_SOURCES))
+        snapshot_changes.put(version, 'changes', changes)
+    return changes
+
+def create_changes_table(changes, by):
+    """Build the Snapshot Changes table: the most churned cities or cuisines"""
+    table = summarize(changes, by).head(CHANGES_ROWS).reset_index()
+    table = table[[by, 'Before', 'After', 'Opened', 'Closed', 'Churn', 'MeanRatingDelta']]
+    return create_table(table.rename(columns={'MeanRatingDelta': 'RatingDelta'}),
+                        'No stores in this selection')
+
+# Custom CSS for the dashboard
+app_style = {
+    'background': 'linear-gradient(165deg, #0057B7, #0098E5)',
+    'min-height': '100vh',
+    'padding': '1.5rem',
+    'font-family': 'SF Pro Display, -apple-system, BlinkMacSystemFont, sans-serif'
+}
+
+card_style = {
+    'background': 'rgba(255, 255, 255, 0.06)',
+    'backdrop-filter': 'blur(8px)',
+    'border': '1px solid rgba(255, 255, 255, 0.08)',
+    'border-radius': '20px',
+    'transition': 'transform 0.2s cubic-bezier(0.4, 0, 0.2, 1)',
+    'margin-bottom': '1rem'
+}
+
+title_style = {
+    'color': 'white',
+    'opacity': '0.9',
+    'letter-spacing': '-0.2px',
+    'font-weight': '400'
+}
+
+# Initialize the Dash app (once: the callbacks below are registered on it)
+external_stylesheets = [dbc.themes.FLATLY, 'https://fonts.googleapis.com/css2?family=SF+Pro+Display:wght@400;500&display=swap']
 if IN_COLAB:
-    app = JupyterDash(__name__, external_stylesheets=[dbc.themes.FLATLY])
+    from jupyter_dash import JupyterDash
+    app = JupyterDash(__name__, external_stylesheets=external_stylesheets)
 else:
-    app = Dash(__name__, external_stylesheets=[dbc.themes.FLATLY])
+    app = Dash(__name__, external_stylesheets=external_stylesheets)
+
+# Per-stage callback timings and cache counters are served at /metrics in the
+# Prometheus text format. Callbacks slower than INSIGHTPLATE_SLOW_CALLBACK_SECONDS
+# (1 second by default) print their span breakdown; set it empty to turn the log off.
+_slow_callback = os.environ.get('INSIGHTPLATE_SLOW_CALLBACK_SECONDS', '1.0')
+SLOW_CALLBACK_SECONDS = float(_slow_callback) if _slow_callback else None
+metrics.slow_threshold = SLOW_CALLBACK_SECONDS
+# Under gunicorn the histograms are merged over all workers, while these
+# per-process gauges carry the pid of the worker that answered the scrape
+metrics.extra.append(lambda: prometheus_counters(
+    'insightplate_result_store', 'Row selection cache counters.', result_store.stats(),
+    metrics.process_labels()))
+metrics.extra.append(lambda: prometheus_counters(
+    'insightplate_figure_cache', 'Figure cache counters.', figure_cache.stats(),
+    metrics.process_labels()))
+metrics.instrument(app.server)
 
 # Define the layout
 app.layout = dbc.Container([
@@ -303,7 +535,8 @@ app.layout = dbc.Container([
                                 dcc.Dropdown(
                                     id='city-filter',
                                     options=[{'label': 'All Cities', 'value': 'All'}],
-                                    value='All',
+                                    value=['All'],
+                                    multi=True,
                                     style=dropdown_style
                                 )
                             ], width=4),
@@ -312,7 +545,8 @@ app.layout = dbc.Container([
                                 dcc.Dropdown(
                                     id='food-type-filter',
                                     options=[{'label': 'All Types', 'value': 'All'}],
-                                    value='All',
+                                    value=['All'],
+                                    multi=True,
                                     style=dropdown_style
                                 )
                             ], width=4),
@@ -321,7 +555,8 @@ app.layout = dbc.Container([
                                 dcc.Dropdown(
                                     id='rating-filter',
                                     options=[{'label': 'All Ratings', 'value': 'All'}],
-                                    value='All',
+                                    value=['All'],
+                                    multi=True,
                                     style=dropdown_style
                                 )
                             ], width=4),
@@ -331,6 +566,25 @@ app.layout = dbc.Container([
             ], width=12)
         ], className='mb-4'),
         
+        # Search Section
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4('Find a Restaurant', style=title_style),
+                        dbc.Input(
+                            id='name-search',
+                            type='search',
+                            placeholder='Search by name, e.g. Jollibee',
+                            debounce=300,
+                            style=dropdown_style
+                        ),
+                        html.Div(id='search-results', className='mt-3', style={'color': 'white'})
+                    ])
+                ], style=card_style)
+            ], width=12)
+        ], className='mb-4'),
+        
         # Map Section
         dbc.Row([
             dbc.Col([
@@ -364,6 +618,59 @@ app.layout = dbc.Container([
             ], width=6)
         ], className='mt-4'),
         
+        # Reviews vs Rating Section
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4('Reviews vs Rating', style=title_style),
+                        dcc.Graph(id='review-density-chart')
+                    ])
+                ], style=card_style)
+            ], width=12)
+        ], className='mt-4'),
+        
+        # Leaderboard Section
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4('Top Rated', style=title_style),
+                        dbc.RadioItems(
+                            id='leaderboard-by',
+                            options=[{'label': label, 'value': value} for value, label in LEADERBOARD_VIEWS.items()],
+                            value='restaurant',
+                            inline=True,
+                            style={'color': 'white'}
+                        ),
+                        html.Div(id='leaderboard-container', className='mt-3', style={'color': 'white'})
+                    ])
+                ], style=card_style)
+            ], width=12)
+        ], className='mt-4'),
+        
+        # Snapshot Changes Section
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4('Changes Between Snapshots', style=title_style),
+                        html.P(f"Stores opened and closed, and rating changes of the stores in both, "
+                               f"from {SNAPSHOT_SOURCES[0]} to {SNAPSHOT_SOURCES[1]}",
+                               style={'color': 'white', 'opacity': '0.7'}),
+                        dbc.RadioItems(
+                            id='changes-by',
+                            options=[{'label': label, 'value': value} for value, label in CHANGES_VIEWS.items()],
+                            value='City',
+                            inline=True,
+                            style={'color': 'white'}
+                        ),
+                        html.Div(id='changes-container', className='mt-3', style={'color': 'white'})
+                    ])
+                ], style=card_style)
+            ], width=12)
+        ], className='mt-4'),
+        
         # Stats Row
         dbc.Row([
             dbc.Col([
@@ -390,79 +697,235 @@ app.layout = dbc.Container([
     [Input('filtered-data', 'data')]
 )
 def update_filters(data):
-    df = pd.read_json(data) if data else load_data()
-    filter_opts = create_filter_options(df)
+    # `data` is the result key of the current selection, not the rows themselves.
+    # Each dropdown lists the values present under the *other* filters, so
+    # more cities (or food types) can be added to a multi-selection
+    with metrics.trace('update_filters'):
+        with metrics.span('load') as span:
+            snapshot = dataset_store.get()
+            span.rows = len(snapshot.df)
+        city_rows = food_type_rows = None
+        selected_cities = selected_food_types = ()
+        if data:
+            if data['version'] != snapshot.version:
+                # The dataset was reloaded; apply the same filters to the new version
+                data = dict(data, version=snapshot.version)
+            city, food_type, rating_range = data['filters']
+            selected_cities, selected_food_types = city or (), food_type or ()
+            with metrics.span('filter') as span:
+                city_rows = cached_rows(snapshot, dict(data, filters=[None, food_type, rating_range]))
+                food_type_rows = cached_rows(snapshot, dict(data, filters=[city, None, rating_range]))
+                span.rows = sum(len(snapshot.df) if rows is None else len(rows)
+                                for rows in (city_rows, food_type_rows))
+        with metrics.span('options'):
+            filter_opts = create_filter_options(snapshot.df, index=snapshot.artifacts['filter_index'],
+                                                city_rows=city_rows, food_type_rows=food_type_rows)
     return [
-        [{'label': 'All Cities', 'value': 'All'}] + filter_opts['cities'],
-        [{'label': 'All Types', 'value': 'All'}] + filter_opts['food_types'],
+        [{'label': 'All Cities', 'value': 'All'}] + with_selected(filter_opts['cities'], selected_cities),
+        [{'label': 'All Types', 'value': 'All'}] + with_selected(filter_opts['food_types'], selected_food_types),
         [{'label': 'All Ratings', 'value': 'All'}] + filter_opts['rating_ranges']
     ]
 
+def with_selected(options, selected):
+    """Dropdown options plus any selected values they lack, so the selection stays visible"""
+    present = {option['value'] for option in options}
+    missing = [{'label': value, 'value': value} for value in selected if value not in present]
+    return sorted(options + missing, key=lambda option: option['value']) if missing else options
+
+# Dashboard outputs as a dependency graph: the filtered rows and the cube
+# slice are shared steps, and the figures and stats built from them run
+# concurrently. Inputs are the dataset snapshot and the filter selection.
+dashboard_graph = CallbackGraph(span=metrics.span)
+DASHBOARD_OUTPUTS = ('map_figure', 'food_type_figure', 'rating_figure', 'density_figure', 'stats')
+
+@dashboard_graph.node('filter', 'snapshot', 'selection', rows=len)
+def filtered_rows(snapshot, key):
+    # The selected rows stay on the server under a small key
+    rows = cached_rows(snapshot, key)
+    return snapshot.df if rows is None else snapshot.df.iloc[rows]
+
+@dashboard_graph.node('aggregate', 'snapshot', 'selection', rows=lambda cube_slice: cube_slice.total)
+def selection_aggregates(snapshot, key):
+    # Aggregates for the map, bar chart and stats come from the cube
+    return snapshot.artifacts['cube'].query(*key['filters'])
+
+@dashboard_graph.node('map_figure', 'aggregate', 'snapshot')
+def map_figure(cube_slice, snapshot):
+    return create_scatter_map(cube_slice.by_city(), snapshot.artifacts['city_coordinates'])
+
+@dashboard_graph.node('food_type_figure', 'aggregate')
+def food_type_figure(cube_slice):
+    return create_food_type_distribution(cube_slice.food_type_counts())
+
+@dashboard_graph.node('rating_figure', 'filter')
+def rating_figure(filtered_df):
+    return create_rating_distribution(*rating_histogram(filtered_df['AverageRating']))
+
+@dashboard_graph.node('density_figure', 'filter')
+def density_figure(filtered_df):
+    grid = review_rating_grid(filtered_df['Reviewers'], filtered_df['AverageRating'], log_reviewers=True)
+    return create_review_density(grid)
+
+@dashboard_graph.node('stats', 'aggregate')
+def stats_panel(cube_slice):
+    return create_stats(cube_slice)
+
 @app.callback(
     [Output('scatter-map', 'figure'),
      Output('food-type-chart', 'figure'),
      Output('rating-chart', 'figure'),
+     Output('review-density-chart', 'figure'),
      Output('stats-container', 'children'),
      Output('filtered-data', 'data')],
     [Input('city-filter', 'value'),
+     Input('food-type-filter', 'value'),
+     Input('rating-filter', 'value')],
+    [State('filtered-data', 'data')]
+)
+def update_dashboard(city, food_type, rating_range, previous=None):
+    # `previous` is the result key the browser's figures were built for
+    with metrics.trace('update_dashboard'):
+        with metrics.span('load') as span:
+            snapshot = dataset_store.get()
+            key = result_key(snapshot.version, city, food_type, rating_range)
+            span.rows = len(snapshot.df)
+        
+        # Selections that normalize to the figures' current one change
+        # nothing, e.g. picking 'All' next to other cities or reordering them
+        if previous is not None and previous == key:
+            raise PreventUpdate
+        
+        # Popular selections are served from the figure cache
+        with metrics.span('cache_lookup'):
+            cached = figure_cache.get(snapshot.version, selection_tuple(key))
+        if cached is not MISSING:
+            return (*cached, key)
+        
+        results = dashboard_graph.run(DASHBOARD_OUTPUTS, {'snapshot': snapshot, 'selection': key})
+        outputs = tuple(results[name] for name in DASHBOARD_OUTPUTS)
+        figure_cache.put(snapshot.version, selection_tuple(key), outputs)
+    return (*outputs, key)
+
+@app.callback(
+    Output('search-results', 'children'),
+    [Input('name-search', 'value'),
+     Input('city-filter', 'value'),
      Input('food-type-filter', 'value'),
      Input('rating-filter', 'value')]
 )
-def update_dashboard(city, food_type, rating_range):
-    # Load and filter data
-    df = load_data()
-    filtered_df = filter_dataframe(df, city, food_type, rating_range)
-    
-    # Create visualizations
-    map_fig = create_scatter_map(filtered_df)
-    food_type_fig = create_food_type_distribution(filtered_df)
-    rating_fig = create_rating_distribution(filtered_df)
-    
-    # Create stats
-    stats = html.Div([
-        dbc.Row([
-            dbc.Col([
-                html.H5(f"Total Restaurants: {len(filtered_df)}", className='mb-2'),
-                html.H5(f"Average Rating: {filtered_df['AverageRating'].mean():.2f}", className='mb-2'),
-                html.H5(f"Most Common Food Type: {filtered_df['FoodType'].mode()[0]}", className='mb-2')
-            ])
-        ])
-    ])
-    
-    return map_fig, food_type_fig, rating_fig, stats, filtered_df.to_json()
+def search_restaurants(query, city, food_type, rating_range):
+    """Restaurants whose name matches `query` within the current filters"""
+    if not query or not query.strip():
+        return None
+    with metrics.trace('search_restaurants'):
+        snapshot = dataset_store.get()
+        with metrics.span('search') as span:
+            result = snapshot.artifacts['name_search'].search(
+                query, limit=SEARCH_RESULTS, filter_index=snapshot.artifacts['filter_index'],
+                city=city, food_type=food_type, rating_range=rating_range)
+            span.rows = len(result)
+        return create_search_results(snapshot.df, result.rows)
 
-# Custom CSS for the dashboard
-app_style = {
-    'background': 'linear-gradient(165deg, #0057B7, #0098E5)',
-    'min-height': '100vh',
-    'padding': '1.5rem',
-    'font-family': 'SF Pro Display, -apple-system, BlinkMacSystemFont, sans-serif'
-}
+@app.callback(
+    Output('leaderboard-container', 'children'),
+    [Input('leaderboard-by', 'value'),
+     Input('city-filter', 'value'),
+     Input('food-type-filter', 'value'),
+     Input('rating-filter', 'value')]
+)
+def update_leaderboard(by, city, food_type, rating_range):
+    """Top restaurants, cities or cuisines by review-weighted rating within the filters"""
+    with metrics.trace('update_leaderboard'):
+        snapshot = dataset_store.get()
+        with metrics.span('rank') as span:
+            table = snapshot.artifacts['leaderboard'].top(
+                by, LEADERBOARD_SIZE, filter_index=snapshot.artifacts['filter_index'],
+                city=city, food_type=food_type, rating_range=rating_range)
+            span.rows = len(table)
+        return create_leaderboard(table)
 
-card_style = {
-    'background': 'rgba(255, 255, 255, 0.06)',
-    'backdrop-filter': 'blur(8px)',
-    'border': '1px solid rgba(255, 255, 255, 0.08)',
-    'border-radius': '20px',
-    'transition': 'transform 0.2s cubic-bezier(0.4, 0, 0.2, 1)',
-    'margin-bottom': '1rem'
-}
+@app.callback(
+    Output('changes-container', 'children'),
+    [Input('changes-by', 'value'),
+     Input('city-filter', 'value'),
+     Input('food-type-filter', 'value')]
+)
+def update_changes(by, city, food_type):
+    """Churn and rating changes per city or cuisine within the City and Food Type filters"""
+    with metrics.trace('update_changes'):
+        with metrics.span('diff') as span:
+            changes = load_snapshot_changes()
+            if changes is None:
+                return html.P(f"Add {SNAPSHOT_SOURCES[0]} and {SNAPSHOT_SOURCES[1]} to compare the snapshots",
+                              style={'opacity': '0.7'})
+            span.rows = len(changes)
+        with metrics.span('summarize'):
+            for column, value in (('City', city), ('FoodType', food_type)):
+                selected = normalize_selection(value)
+                if selected is not None:
+                    changes = changes[changes[column].isin(selected)]
+            return create_changes_table(changes, by)
 
-title_style = {
-    'color': 'white',
-    'opacity': '0.9',
-    'letter-spacing': '-0.2px',
-    'font-weight': '400'
-}
+# Start-up: warm_up() loads the data, builds its indexes and renders the
+# default view before the server takes traffic. /ready answers 503 until it
+# has finished, for load balancers and orchestrators to probe.
+startup = {'imported': time.time(), 'ready': None, 'first_response': None}
+
+def warm_up():
+    """Load the dataset and render the default view; the first call marks the app ready"""
+    start = time.time()
+    update_filters(None)
+    update_dashboard(['All'], ['All'], ['All'])
+    load_snapshot_changes()
+    end = time.time()
+    # Reloads (SIGHUP, data file changes) warm up again but keep the first readiness time
+    if startup['ready'] is None:
+        startup['ready'] = end
+        print(f"Dashboard ready in {startup['ready'] - PROCESS_START:.2f}s "
+              f"(import {startup['imported'] - PROCESS_START:.2f}s, warm-up {end - start:.2f}s)")
+    else:
+        print(f"Dashboard warmed up for the reloaded data in {end - start:.2f}s")
+
+@app.server.route('/ready')
+def ready():
+    if startup['ready'] is None:
+        return 'warming up', 503
+    return 'ready', 200
+
+@app.server.after_request
+def record_first_response(response):
+    if startup['first_response'] is None and request.path not in ('/ready', '/metrics'):
+        startup['first_response'] = time.time()
+    return response
+
+def startup_seconds():
+    """Seconds from process start to each start-up milestone reached so far"""
+    return {phase: moment - PROCESS_START for phase, moment in startup.items() if moment is not None}
+
+metrics.extra.append(lambda: prometheus_counters(
+    'insightplate_startup_seconds', 'Seconds from process start to each start-up milestone.', startup_seconds(),
+    metrics.process_labels()))
+
+def after_fork():
+    """Reset the locks and per-process state of a forked worker (see gunicorn.conf.py)"""
+    dataset_store.after_fork()
+    for cache in (result_store, figure_cache, snapshot_changes):
+        cache.after_fork()
+    metrics.after_fork()
 
 # Run the app
 if __name__ == '__main__':
     try:
+        # Locally, debug=True starts a reloader that runs this module again in
+        # a child process to serve the requests; only that process loads the
+        # data and watches the file, the parent just restarts it on edits
+        serving = IN_COLAB or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+        
+        # Pick up new merges of FoodpandaCombo.csv without restarting the server
+        if serving:
+            dataset_store.start_watching()
+        
         if IN_COLAB:
-            # For Google Colab, use JupyterDash
-            app = JupyterDash(__name__, 
-                            external_stylesheets=[dbc.themes.FLATLY, 'https://fonts.googleapis.com/css2?family=SF+Pro+Display:wght@400;500&display=swap'])
-            
             print("\nChoose an option:")
             print("1. Merge CSV files (if you have 'restos (1).csv' and 'restos_2025.csv')")
             print("2. Upload existing FoodpandaCombo.csv")
@@ -480,17 +943,19 @@ if __name__ == '__main__':
                 print("\nPlease upload your FoodpandaCombo.csv file")
                 uploaded = files.upload()
                 filename = next(iter(uploaded))
-                df = pd.read_csv(filename)
+                dataset_store.stop_watching()
+                dataset_store = create_dataset_store(filename)
+                dataset_store.start_watching()
+            warm_up()
             
             # Run the server
             app.run_server(mode='external', port=8050, debug=True)
             
         else:
-            # For local development
-            app = Dash(__name__, 
-                      external_stylesheets=[dbc.themes.FLATLY, 'https://fonts.googleapis.com/css2?family=SF+Pro+Display:wght@400;500&display=swap'])
-            df = pd.read_csv('FoodpandaCombo.csv')
-            app.run_server(debug=True)
+            # For local development; use wsgi.py with gunicorn for production
+            if serving:
+                warm_up()
+            app.run(debug=True)
             
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pre-aggregated City x FoodType x rating-bucket cube for the dashboard.
+
+Every dashboard figure except the rating histogram is an aggregate of the
+filtered rows. The cube stores, per (City, FoodType, rating bucket) cell, the
+number of restaurants, the sum and count of ratings, and the reviewer total.
+Answering a filter selection then only touches the matching cells, so the
+cost depends on the number of categories and not on the number of rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_loader import parse_reviewers
+from filter_index import RATING_RANGES, normalize_selection, rating_bucket_codes
+
+
+class CubeSlice:
+    """Aggregates of the cube cells matching one filter selection."""
+
+    def __init__(self, cube, cells):
+        self.cube = cube
+        self.cells = cells
+
+    @property
+    def total(self):
+        return int(self.cells['count'].sum())
+
+    @property
+    def mean_rating(self):
+        rated = self.cells['rating_count'].sum()
+        return self.cells['rating_sum'].sum() / rated if rated else float('nan')
+
+    def food_type_counts(self):
+        """Restaurant counts per FoodType, largest first (ties by name)."""
+        cells = self.cells[self.cells['FoodType'] >= 0]
+        counts = np.bincount(cells['FoodType'], weights=cells['count'],
+                             minlength=len(self.cube.food_types))
+        series = pd.Series(counts.astype('int64'), index=pd.Index(self.cube.food_types, name='FoodType'))
+        series = series[series > 0]
+        order = np.lexsort((series.index.to_numpy(dtype=str), -series.to_numpy()))
+        return series.iloc[order]
+
+    @property
+    def most_common_food_type(self):
+        counts = self.food_type_counts()
+        return counts.index[0] if len(counts) else None
+
+    def by_city(self):
+        """Per-City restaurant count, mean AverageRating and summed Reviewers."""
+        n = len(self.cube.cities)
+        cells = self.cells[self.cells['City'] >= 0]
+        codes = cells['City'].to_numpy()
+        restaurants = np.bincount(codes, weights=cells['count'], minlength=n)
+        rating_sum = np.bincount(codes, weights=cells['rating_sum'], minlength=n)
+        rating_count = np.bincount(codes, weights=cells['rating_count'], minlength=n)
+        reviewers = np.bincount(codes, weights=cells['reviewer_sum'], minlength=n)
+
+        present = restaurants > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_rating = rating_sum / rating_count
+        return pd.DataFrame({
+            'City': np.asarray(self.cube.cities, dtype=object)[present],
+            'AverageRating': mean_rating[present],
+            'Reviewers': reviewers[present],
+            'Restaurants': restaurants[present].astype('int64'),
+        })
+
+
+class AggregateCube:
+    """Counts, rating sums and reviewer sums per (City, FoodType, rating bucket)."""
+
+    def __init__(self, df):
+        city_codes, self.cities = pd.factorize(df['City'], sort=True)
+        food_codes, self.food_types = pd.factorize(df['FoodType'], sort=True)
+        bucket_codes = rating_bucket_codes(df['AverageRating'])
+        self.cities = list(self.cities)
+        self.food_types = list(self.food_types)
+        self.rating_ranges = list(RATING_RANGES)
+
+        ratings = df['AverageRating'].to_numpy(dtype='float64')
+        rated = ~np.isnan(ratings)
+        reviewers = parse_reviewers(df['Reviewers']).to_numpy(dtype='float64')
+
+        # One flat cell id per row; missing values (-1) get their own slot so
+        # those rows still count towards the totals
+        shape = (len(self.cities) + 1, len(self.food_types) + 1, len(self.rating_ranges) + 1)
+        cell_ids = np.ravel_multi_index((city_codes + 1, food_codes + 1, bucket_codes + 1), shape)
+        cells, inverse = np.unique(cell_ids, return_inverse=True)
+        city, food, bucket = np.unravel_index(cells, shape)
+
+        self._set_cells(pd.DataFrame({
+            'City': city - 1,
+            'FoodType': food - 1,
+            'RatingRange': bucket - 1,
+            'count': np.bincount(inverse, minlength=len(cells)),
+            'rating_sum': np.bincount(inverse, weights=np.where(rated, ratings, 0), minlength=len(cells)),
+            'rating_count': np.bincount(inverse, weights=rated, minlength=len(cells)),
+            'reviewer_sum': np.bincount(inverse, weights=reviewers, minlength=len(cells)),
+        }))
+
+    def _set_cells(self, cells):
+        self.cells = cells
+        self._positions = {
+            'City': {label: i for i, label in enumerate(self.cities)},
+            'FoodType': {label: i for i, label in enumerate(self.food_types)},
+            'RatingRange': {label: i for i, label in enumerate(self.rating_ranges)},
+        }
+
+    def updated(self, added, removed):
+        """Return a new cube with the `added` rows counted and the `removed` rows taken out.
+
+        Used for incremental ingestion: the cost depends on the size of the
+        delta and the number of cells, not on the size of the dataset.
+        """
+        parts = [(self, 1), (AggregateCube(added), 1), (AggregateCube(removed), -1)]
+        cities = sorted(set().union(*(part.cities for part, _ in parts)))
+        food_types = sorted(set().union(*(part.food_types for part, _ in parts)))
+
+        frames = []
+        for part, sign in parts:
+            cells = part.cells.copy()
+            for name, labels, old_labels in (('City', cities, part.cities),
+                                             ('FoodType', food_types, part.food_types)):
+                # Map old codes to positions in the merged labels; -1 stays -1
+                remap = np.append(np.searchsorted(labels, old_labels), -1).astype('int64')
+                cells[name] = remap[cells[name].to_numpy()]
+            cells[['count', 'rating_sum', 'rating_count', 'reviewer_sum']] *= sign
+            frames.append(cells)
+
+        cells = pd.concat(frames).groupby(['City', 'FoodType', 'RatingRange'], as_index=False).sum()
+        cube = AggregateCube.__new__(AggregateCube)
+        cube.cities = cities
+        cube.food_types = food_types
+        cube.rating_ranges = list(self.rating_ranges)
+        cube._set_cells(cells[cells['count'] > 0].reset_index(drop=True))
+        return cube
+
+    def query(self, city=None, food_type=None, rating_range=None):
+        """Return the CubeSlice for a filter selection (same arguments as FilterIndex.rows)."""
+        keep = np.ones(len(self.cells), dtype=bool)
+        for name, value in (('City', city), ('FoodType', food_type), ('RatingRange', rating_range)):
+            selected = normalize_selection(value)
+            if selected is None:
+                continue
+            codes = [self._positions[name][v] for v in selected if v in self._positions[name]]
+            keep &= self.cells[name].isin(codes).to_numpy()
+        return CubeSlice(self, self.cells[keep])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared City- and FoodType-level statistics for the analysis script.
+
+`aggregates(df)` returns one `DatasetAggregates` per DataFrame, memoized,
+so every plot and print function of a report reads the same results. Each
+grouping key is scanned once: the rows are grouped by the key, and the
+count, means, sums and rating/reviewer quantiles (the median is the 0.5
+quantile) are all computed on that one grouping.
+"""
+
+import weakref
+
+import pandas as pd
+
+QUANTILES = (0.25, 0.5, 0.75, 0.9, 0.95)
+
+_memo = {}
+
+
+def _quantile_name(column, q):
+    return f"{column}_median" if q == 0.5 else f"{column}_q{int(round(q * 100))}"
+
+
+class DatasetAggregates:
+    """Lazily computed statistics of one dataset, each grouping computed once.
+
+    `df` must not be modified after its aggregates have been requested.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._groups = {}
+        self._overall = None
+        self.passes = 0  # grouped scans of the data, for checking the memoization
+
+    def by(self, key):
+        """Statistics per value of `key`, one row per group.
+
+        Columns: count, rating_mean, rating_median, rating_q25/q75/q90/q95,
+        reviewers_sum, reviewers_mean, reviewers_median, reviewers_q25/...
+        """
+        stats = self._groups.get(key)
+        if stats is None:
+            stats = self._groups[key] = self._group(self.df, key)
+            self.passes += 1
+        return stats
+
+    @property
+    def city(self):
+        return self.by('City')
+
+    @property
+    def food_type(self):
+        return self.by('FoodType')
+
+    @property
+    def overall(self):
+        """The same statistics over the whole dataset, as a Series."""
+        if self._overall is None:
+            key = pd.Series(0, index=self.df.index, name='_all')
+            self._overall = self._group(self.df.assign(_all=key), '_all').iloc[0]
+            self.passes += 1
+        return self._overall
+
+    def top(self, key, column, n, ascending=False):
+        """The `n` groups of `key` with the highest (or lowest) `column`."""
+        return self.by(key)[column].sort_values(ascending=ascending, kind='stable').head(n)
+
+    @staticmethod
+    def _group(df, key):
+        grouped = df.groupby(key, observed=True, sort=True)
+        stats = grouped.agg(
+            count=('AverageRating', 'size'),
+            rating_mean=('AverageRating', 'mean'),
+            reviewers_sum=('Reviewers', 'sum'),
+            reviewers_mean=('Reviewers', 'mean'),
+        )
+        quantiles = grouped[['AverageRating', 'Reviewers']].quantile(list(QUANTILES)).unstack()
+        for column, prefix in (('AverageRating', 'rating'), ('Reviewers', 'reviewers')):
+            for q in QUANTILES:
+                stats[_quantile_name(prefix, q)] = quantiles[(column, q)]
+        return stats
+
+
+def aggregates(df):
+    """Return the memoized DatasetAggregates of `df`."""
+    entry = _memo.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    result = DatasetAggregates(df)
+    # Drop the entry when the frame goes away, so ids are never reused stale
+    _memo[id(df)] = (weakref.ref(df, lambda _, key=id(df): _memo.pop(key, None)), result)
+    return result
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite for the InsightPlate dashboard pipeline.
+
+Synthetic datasets with the FoodpandaCombo.csv schema are generated at each
+scale with a fixed seed. City, FoodType, AverageRating and Reviewers are
+drawn from the empirical distributions of the real FoodpandaCombo.csv,
+including its "(100+)" reviewer buckets. Every dashboard stage is timed at
+every scale and its peak traced memory is recorded: loading, index and cube
+builds, filtering, each figure and the end-to-end `update_dashboard`, whose
+JSON payload size is recorded as well. Generated data and the results
+(bench_data/results.json by default) stay under bench_data/.
+
+Usage:
+    python benchmark.py                                 # 10k, 100k, 1M, 10M rows
+    python benchmark.py --scales 10k,100k --output bench_data/base.json
+    python benchmark.py --scales 10k,100k --compare bench_data/base.json
+    python benchmark.py --scales 10k --cold-start        # also time a fresh server start
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+DEFAULT_SCALES = '10k,100k,1M,10M'
+DATA_DIR = 'bench_data'
+SOURCE = 'FoodpandaCombo.csv'
+
+
+def parse_scale(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip().upper()
+    factor = {'K': 1_000, 'M': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('KM')) * factor)
+
+
+def generate_dataset(rows, seed=42, source=SOURCE):
+    """Generate `rows` synthetic restaurants shaped like `source`.
+
+    Each column is sampled from the empirical distribution of the real file,
+    so category frequencies, the rating spike at 0 and 5, and the mix of
+    numeric and "(N+)" reviewer counts all match production data.
+    """
+    real = pd.read_csv(source, dtype=str)
+    rng = np.random.default_rng(seed)
+
+    def sample(column):
+        values = real[column].dropna().to_numpy()
+        return values[rng.integers(0, len(values), rows)]
+
+    names = sample('StoreName')
+    locations = sample('Location')
+    store_ids = np.char.mod('%07x', rng.permutation(rows * 2)[:rows])
+    return pd.DataFrame({
+        'StoreId': store_ids,
+        'StoreName': names,
+        'CompleteStoreName': pd.Series(names).str.strip() + ' - ' + pd.Series(locations),
+        'FoodType': sample('FoodType'),
+        'AverageRating': sample('AverageRating'),
+        'Reviewers': sample('Reviewers'),
+        'City': sample('City'),
+        'Location': locations,
+    })
+
+
+def dataset_path(rows, seed):
+    """Write (once) and return the synthetic CSV for a scale."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'synthetic_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        generate_dataset(rows, seed).to_csv(path, index=False)
+    return path
+
+
+def measure(func, repeat):
+    """Run `func` `repeat` times; return its last result, timings and peak traced memory.
+
+    Memory is traced in one extra run, since tracemalloc slows down the code
+    it traces and would distort the timings.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {
+        'seconds': statistics.median(timings),
+        'runs': timings,
+        'peak_mb': peak / 1e6,
+    }
+
+
+def run_scale(rows, seed, repeat):
+    """Time every dashboard stage on one synthetic dataset."""
+    import FinalCode as fc
+
+    path = dataset_path(rows, seed)
+    stages = {}
+
+    df, stages['load_data'] = measure(lambda: fc.read_and_clean(path), repeat)
+    index, stages['build_filter_index'] = measure(lambda: fc.FilterIndex(df), repeat)
+    cube, stages['build_cube'] = measure(lambda: fc.AggregateCube(df), repeat)
+    coords = fc.gazetteer.city_table(df['City'])
+
+    # A busy city and cuisine with a rating bucket: the typical dashboard query
+    city = df['City'].value_counts().index[0]
+    food_type = df['FoodType'].value_counts().index[0]
+    selection = ([city], [food_type], ['4.5+'])
+
+    filtered, stages['filter_dataframe'] = measure(
+        lambda: fc.filter_dataframe(df, *selection, index=index), repeat)
+    cube_slice, stages['cube_query'] = measure(lambda: cube.query(*selection), repeat)
+    _, stages['create_scatter_map'] = measure(
+        lambda: fc.create_scatter_map(cube_slice.by_city(), coords), repeat)
+    _, stages['create_food_type_distribution'] = measure(
+        lambda: fc.create_food_type_distribution(cube_slice.food_type_counts()), repeat)
+    _, stages['create_rating_distribution'] = measure(
+        lambda: fc.create_rating_distribution(*fc.rating_histogram(filtered['AverageRating'])), repeat)
+    _, stages['create_review_density'] = measure(
+        lambda: fc.create_review_density(fc.review_rating_grid(
+            filtered['Reviewers'], filtered['AverageRating'], log_reviewers=True)), repeat)
+
+    # End to end through the callback, on a cold figure cache every run
+    fc.dataset_store = fc.create_dataset_store(path)
+    fc.dataset_store.get()
+
+    def dashboard():
+        fc.figure_cache.memory.clear()
+        fc.result_store.clear()
+        return fc.update_dashboard(*selection)
+
+    outputs, stages['update_dashboard'] = measure(dashboard, repeat)
+    # Size of the JSON the browser receives; should not grow with the row count
+    stages['update_dashboard']['payload_bytes'] = len(to_json_plotly(outputs))
+    _, stages['update_dashboard_cached'] = measure(lambda: fc.update_dashboard(*selection), repeat)
+
+    for stage in stages.values():
+        stage['rows'] = rows
+    stages['filter_dataframe']['rows_out'] = len(filtered)
+    return stages
+
+
+COLD_START_SERVER = (
+    "import sys, wsgi\n"
+    "from werkzeug.serving import run_simple\n"
+    "run_simple('127.0.0.1', int(sys.argv[1]), wsgi.server, threaded=True)\n"
+)
+
+DEFAULT_CALLBACK = {
+    'output': '..scatter-map.figure...food-type-chart.figure...rating-chart.figure...'
+              'review-density-chart.figure...stats-container.children...filtered-data.data..',
+    'outputs': [{'id': id_, 'property': prop} for id_, prop in (
+        ('scatter-map', 'figure'), ('food-type-chart', 'figure'), ('rating-chart', 'figure'),
+        ('review-density-chart', 'figure'), ('stats-container', 'children'), ('filtered-data', 'data'))],
+    'inputs': [{'id': id_, 'property': 'value', 'value': ['All']}
+               for id_ in ('city-filter', 'food-type-filter', 'rating-filter')],
+    'state': [{'id': 'filtered-data', 'property': 'data', 'value': None}],
+    'changedPropIds': [],
+}
+
+
+def measure_cold_start(port=8799, timeout=120.0):
+    """Start the production entry point (wsgi.py) in a fresh process and time it.
+
+    Returns the seconds from launch until /ready answers, until the page is
+    served, and until the first dashboard callback (the default view) returns.
+    """
+    base = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-c', COLD_START_SERVER, str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def fetch(path, body=None):
+        data = None if body is None else json.dumps(body).encode()
+        headers = {'Content-Type': 'application/json'} if body else {}
+        with urllib.request.urlopen(urllib.request.Request(base + path, data, headers), timeout=30) as r:
+            return r.read()
+
+    try:
+        while True:
+            if time.perf_counter() - start > timeout or server.poll() is not None:
+                raise RuntimeError('server did not become ready')
+            try:
+                fetch('/ready')
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+        ready = time.perf_counter() - start
+        fetch('/')
+        first_page = time.perf_counter() - start
+        fetch('/_dash-update-component', DEFAULT_CALLBACK)
+        first_callback = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return {'ready': ready, 'first_page': first_page, 'first_callback': first_callback}
+
+
+def compare(results, baseline, threshold):
+    """Return the stages slower than `baseline` by more than `threshold` (a fraction)."""
+    regressions = []
+    for scale, stages in results['results'].items():
+        for stage, current in stages.items():
+            base = baseline.get('results', {}).get(scale, {}).get(stage)
+            if not base or base['seconds'] <= 0:
+                continue
+            ratio = current['seconds'] / base['seconds']
+            if ratio > 1 + threshold:
+                regressions.append((scale, stage, base['seconds'], current['seconds'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the InsightPlate dashboard stages')
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help='comma-separated row counts, e.g. 10k,1M')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage (the median is reported)')
+    parser.add_argument('--output', default=os.path.join(DATA_DIR, 'results.json'))
+    parser.add_argument('--compare', metavar='BASELINE', help='flag slowdowns against a stored results file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before flagging (0.2 = 20%%)')
+    parser.add_argument('--cold-start', action='store_true', help='also time a fresh server to its first response')
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    for scale in args.scales.split(','):
+        rows = parse_scale(scale)
+        print(f"\n=== {rows:,} rows ===")
+        stages = run_scale(rows, args.seed, args.repeat)
+        results['results'][str(rows)] = stages
+        for name, stage in stages.items():
+            print(f"{name:32s} {stage['seconds'] * 1000:10.2f} ms {stage['peak_mb']:10.1f} MB")
+        print(f"{'update_dashboard payload':32s} {stages['update_dashboard']['payload_bytes'] / 1024:10.1f} KiB")
+
+    if args.cold_start:
+        results['cold_start'] = measure_cold_start()
+        print("\n=== Cold start (seconds from launch) ===")
+        for name, seconds in results['cold_start'].items():
+            print(f"{name:32s} {seconds:10.2f} s")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nSlower than {args.compare} by more than {args.threshold:.0%}:")
+            for scale, stage, before, after, ratio in regressions:
+                print(f"  {int(scale):>10,} rows  {stage:32s} {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
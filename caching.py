@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+In-process caches for dashboard results.
+
+`BoundedCache` is a thread-safe LRU map bounded by entry count and by an
+estimate of its values' size in bytes, with optional time-to-live expiry.
+It counts hits, misses and evictions so cache behaviour can be monitored.
+
+`VersionedCache` puts a BoundedCache (and optionally a directory of pickles)
+in front of results that depend on the dataset version. The memory entries
+are dropped as soon as a lookup arrives for a different version; on disk,
+the previous version is kept for processes that have not reloaded yet.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by BoundedCache.get when a key is absent and no default is given,
+# so that None can be cached as a regular value
+MISSING = object()
+
+
+def estimate_size(value):
+    """Best-effort size of a cached value in bytes."""
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """Thread-safe LRU cache with entry, byte and age limits.
+
+    Args:
+        max_entries: Maximum number of entries kept.
+        max_bytes: Maximum total estimated size of the values, or None.
+        ttl: Seconds an entry stays valid after it was stored, or None.
+        sizeof: Callable estimating the size of a value in bytes.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, ttl=None, sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Larger than the whole cache; storing it would only flush everything else
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def after_fork(self):
+        """Recreate the lock in a forked child; the parent may have held it during fork."""
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+class VersionedCache:
+    """Two-tier cache of results computed from one dataset version.
+
+    Lookups and stores carry the dataset version. When it differs from the
+    version the cache currently holds, both tiers are invalidated first.
+    The memory tier is a BoundedCache; the optional disk tier keeps one
+    pickle per key under `disk_dir/<version>/`, so workers and restarts
+    serving the same dataset version can reuse each other's results.
+
+    Workers sharing `disk_dir` switch versions at different times during a
+    reload, so a switch only deletes the directories older than the most
+    recently used other version; a worker still on that one keeps its entries.
+    """
+
+    def __init__(self, max_entries=128, disk_dir=None):
+        self.memory = BoundedCache(max_entries=max_entries)
+        self.disk_dir = disk_dir
+        self.version = None
+        self.disk_hits = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _use_version(self, version):
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                self.invalidations += 1
+            self.memory.clear()
+            if self.disk_dir is not None:
+                self._prune_disk(version)
+            self.version = version
+
+    def _prune_disk(self, version):
+        """Delete the disk entries of every version but `version` and the latest other one."""
+        def last_used(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                # Another process has just deleted it
+                return 0.0
+
+        try:
+            others = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir) if name != version]
+        except OSError:
+            return
+        # Other processes may prune concurrently; missing directories are ignored
+        for path in sorted(others, key=last_used, reverse=True)[1:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _disk_path(self, version, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, version, digest + '.pkl')
+
+    def get(self, version, key, default=MISSING):
+        self._use_version(version)
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        if self.disk_dir is not None:
+            try:
+                with open(self._disk_path(version, key), 'rb') as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return default
+            self.disk_hits += 1
+            self.memory.put(key, value)
+            return value
+        return default
+
+    def put(self, version, key, value):
+        self._use_version(version)
+        self.memory.put(key, value)
+        if self.disk_dir is not None:
+            path = self._disk_path(version, key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except OSError:
+                # The version was pruned by another process meanwhile; the
+                # memory tier still has the value
+                pass
+
+    def after_fork(self):
+        """Recreate the locks in a forked child; the entries are inherited."""
+        self._lock = threading.Lock()
+        self.memory.after_fork()
+
+    def stats(self):
+        stats = self.memory.stats()
+        # A disk hit is a memory miss that still avoided recomputing the value
+        stats['misses'] -= self.disk_hits
+        stats.update(disk_hits=self.disk_hits, invalidations=self.invalidations, version=self.version)
+        return stats
@@ -1,23 +1,60 @@
 #!/usr/bin/env python3
 
+"""
+Convert insightplate_analysis.py into Final-InsightPlate.ipynb.
+
+By default the script is split into cells (one per function, markdown for
+top-level docstrings) and written unexecuted. With --build the notebook is
+also executed, with main() split into one cell per step (load, each plot,
+the conclusions), and only the cells that changed since the last build are
+run:
+
+- Each code cell is parsed to find the names it defines and uses. A cell
+  depends on the last earlier cell that defines each name it uses. A step
+  that binds nothing and prints or shows nothing (setup_visualization_style())
+  is a dependency of every later cell.
+- A cell's hash covers its source, the hashes of the cells it depends on,
+  the contents of the data files named in it (e.g. 'restos.csv') and the
+  sources of the local modules it imports, recursively.
+- Outputs are cached per hash in .notebook_cache/. Cells whose hash is
+  cached keep their outputs. Changed cells are executed together with the
+  cells they depend on, for their state.
+- Changed cells that do not depend on each other are spread over
+  `--workers` kernels that run in parallel.
+
+Editing the conclusions text, for example, re-runs only the imports,
+definitions, data load and print_conclusions cells; the plots are reused.
+
+Usage:
+    python convert_to_notebook.py                 # unexecuted notebook
+    python convert_to_notebook.py --build --workers 4
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import sys
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import nbformat as nbf
 
-def create_notebook_from_py(py_file, ipynb_file):
-    """Convert a Python file to Jupyter notebook with proper cell separation."""
-    
-    # Read the Python file
-    with open(py_file, 'r') as f:
-        content = f.read()
-    
-    # Create a new notebook
-    nb = nbf.v4.new_notebook()
-    
-    # Split content into cells based on function definitions and comments
+CACHE_DIR = '.notebook_cache'
+KERNEL_NAME = 'python3'
+# Calls that make a cell produce output (print(...), plt.show(), display(...))
+OUTPUT_CALLS = {'print', 'display', 'show'}
+
+def split_cells(content):
+    """Split Python source into (source, 'code' | 'markdown') cells."""
     cells = []
     current_cell = []
     in_markdown = False
     markdown_lines = []
-    
+
     for line in content.split('\n'):
         # Handle markdown-style comments
         if (line.startswith('"""') or line.startswith("'''")) and not in_markdown:
@@ -26,7 +63,7 @@ def create_notebook_from_py(py_file, ipynb_file):
                 current_cell = []
             in_markdown = True
             continue
-        
+
         if in_markdown:
             if line.endswith('"""') or line.endswith("'''"):
                 in_markdown = False
@@ -35,30 +72,291 @@ def create_notebook_from_py(py_file, ipynb_file):
             else:
                 markdown_lines.append(line)
             continue
-        
+
         # Handle code cells
         if line.startswith('def ') or line.startswith('if __name__'):
             if current_cell:
                 cells.append(('\n'.join(current_cell), 'code'))
                 current_cell = []
-        
+
         current_cell.append(line)
-    
+
     # Add the last cell if it exists
     if current_cell:
         cells.append(('\n'.join(current_cell), 'code'))
-    
-    # Create notebook cells
-    for content, cell_type in cells:
-        if content.strip():  # Only create cells for non-empty content
-            if cell_type == 'code':
-                nb.cells.append(nbf.v4.new_code_cell(content))
-            else:
-                nb.cells.append(nbf.v4.new_markdown_cell(content))
-    
+
+    # Only keep cells with content
+    return [(source, cell_type) for source, cell_type in cells if source.strip()]
+
+def create_notebook_from_py(py_file, ipynb_file):
+    """Convert a Python file to Jupyter notebook with proper cell separation."""
+
+    # Read the Python file
+    with open(py_file, 'r') as f:
+        content = f.read()
+
+    # Create a new notebook
+    nb = nbf.v4.new_notebook()
+
+    # Split content into cells based on function definitions and comments
+    for content, cell_type in split_cells(content):
+        if cell_type == 'code':
+            nb.cells.append(nbf.v4.new_code_cell(content))
+        else:
+            nb.cells.append(nbf.v4.new_markdown_cell(content))
+
     # Write the notebook
     with open(ipynb_file, 'w') as f:
         nbf.write(nb, f)
 
+# Cached, incremental builds of the executed notebook
+
+def main_steps(cells):
+    """Replace the main() and `if __name__` cells with one cell per statement of main()."""
+    result = []
+    for source, cell_type in cells:
+        if cell_type == 'code' and source.lstrip().startswith('if __name__'):
+            continue
+        tree = _parse(source) if cell_type == 'code' else None
+        func = tree.body[0] if tree is not None and len(tree.body) == 1 else None
+        if not (isinstance(func, ast.FunctionDef) and func.name == 'main'):
+            result.append((source, cell_type))
+            continue
+
+        lines = source.split('\n')
+        body = func.body[1:] if ast.get_docstring(func) is not None else func.body
+        start = body[0].lineno - 1 if body else 0
+        # Comments between statements ("# Load and process data") start the next step
+        while start > 0 and lines[start - 1].strip().startswith('#'):
+            start -= 1
+        for stmt in body:
+            step = textwrap.dedent('\n'.join(lines[start:stmt.end_lineno])).strip()
+            # Plot functions return their figure; ';' keeps it from being shown twice
+            if isinstance(stmt, ast.Expr):
+                step += ';'
+            result.append((step, 'code'))
+            start = stmt.end_lineno
+    return result
+
+def _parse(source):
+    try:
+        return ast.parse(source)
+    except SyntaxError:
+        return None
+
+class CellInfo:
+    """Names a code cell defines and uses, the data files it names and the local modules it imports."""
+
+    def __init__(self, source, base_dir):
+        self.defines = set()
+        self.uses = set()
+        self.files = set()
+        self.modules = set()
+        self.output = False
+        tree = _parse(source)
+        # Unparseable cells depend on everything before them
+        self.opaque = tree is None
+        if tree is None:
+            return
+
+        for stmt in tree.body:
+            names = [n for n in ast.walk(stmt) if isinstance(n, ast.Name)]
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.defines.add(stmt.name)
+                # Free names of the body: used but not bound inside it
+                local = {n.id for n in names if isinstance(n.ctx, ast.Store)}
+                local |= {a.arg for a in ast.walk(stmt) if isinstance(a, ast.arg)}
+                self.uses |= {n.id for n in names if isinstance(n.ctx, ast.Load)} - local
+            elif isinstance(stmt, (ast.Import, ast.ImportFrom)):
+                for alias in stmt.names:
+                    self.defines.add(alias.asname or alias.name.split('.')[0])
+            else:
+                self.defines |= {n.id for n in names if isinstance(n.ctx, ast.Store)}
+                self.uses |= {n.id for n in names if isinstance(n.ctx, ast.Load)}
+
+        self.modules = {m for m in _imported_modules(tree) if os.path.isfile(os.path.join(base_dir, m + '.py'))}
+        self.files = _data_files(tree, base_dir)
+        for call in ast.walk(tree):
+            if isinstance(call, ast.Call):
+                name = getattr(call.func, 'id', None) or getattr(call.func, 'attr', None)
+                self.output = self.output or name in OUTPUT_CALLS
+
+def _imported_modules(tree):
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules |= {alias.name.split('.')[0] for alias in node.names}
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules.add(node.module.split('.')[0])
+    return modules
+
+def _data_files(tree, base_dir):
+    """String literals of a tree that name existing files under `base_dir`."""
+    literals = {node.value for node in ast.walk(tree)
+                if isinstance(node, ast.Constant) and isinstance(node.value, str)
+                and 0 < len(node.value) < 256 and '\n' not in node.value}
+    return {name for name in literals if os.path.isfile(os.path.join(base_dir, name))}
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+@lru_cache(maxsize=None)
+def module_digest(name, base_dir):
+    """Hash of a local module, the data files it names and the local modules it imports."""
+    path = os.path.join(base_dir, name + '.py')
+    with open(path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source)
+    tree = _parse(source) or ast.Module(body=[], type_ignores=[])
+    for data_file in sorted(_data_files(tree, base_dir)):
+        digest.update(file_digest(os.path.join(base_dir, data_file)).encode())
+    for module in sorted(_imported_modules(tree) - {name}):
+        if os.path.isfile(os.path.join(base_dir, module + '.py')):
+            digest.update(module_digest(module, base_dir).encode())
+    return digest.hexdigest()
+
+def dependencies(infos):
+    """Indexes of the cells each code cell depends on (None for markdown cells)."""
+    deps, defined_by, setups, outputs = [], {}, [], {}
+    for i, info in enumerate(infos):
+        if info is None:
+            deps.append(None)
+            continue
+        if info.opaque:
+            named = {j for j, other in enumerate(infos[:i]) if other is not None}
+        else:
+            named = {defined_by[name] for name in info.uses if name in defined_by}
+        deps.append(named | set(setups))
+
+        # Does running the cell print or show anything, directly or through the functions it calls?
+        outputs[i] = info.output or any(outputs[j] for j in named)
+        for name in info.defines:
+            defined_by[name] = i
+        if not info.defines and not outputs[i] and not info.opaque:
+            setups.append(i)
+    return deps
+
+def cell_hashes(cells, infos, deps, base_dir):
+    """Content hash of every cell, covering its dependencies and inputs."""
+    environment = f"{sys.version}|{KERNEL_NAME}"
+    hashes = []
+    for (source, cell_type), info, cell_deps in zip(cells, infos, deps):
+        digest = hashlib.sha256(f"{environment}|{cell_type}|{source}".encode())
+        if info is not None:
+            for j in sorted(cell_deps):
+                digest.update(hashes[j].encode())
+            for data_file in sorted(info.files):
+                digest.update(file_digest(os.path.join(base_dir, data_file)).encode())
+            for module in sorted(info.modules):
+                digest.update(module_digest(module, base_dir).encode())
+        hashes.append(digest.hexdigest())
+    return hashes
+
+def closure(i, deps):
+    """Cell `i` and every cell it depends on, directly or not."""
+    needed, stack = set(), [i]
+    while stack:
+        j = stack.pop()
+        if j not in needed:
+            needed.add(j)
+            stack.extend(deps[j])
+    return needed
+
+def execute_cells(sources, cwd, timeout):
+    """Run code cells in a fresh kernel; return each cell's outputs as JSON."""
+    from nbclient import NotebookClient
+
+    # Inline figures even when MPLBACKEND is set for headless scripts
+    os.environ['MPLBACKEND'] = 'module://matplotlib_inline.backend_inline'
+    nb = nbf.v4.new_notebook()
+    nb.cells = [nbf.v4.new_code_cell(source) for source in sources]
+    NotebookClient(nb, kernel_name=KERNEL_NAME, timeout=timeout,
+                   resources={'metadata': {'path': cwd}}).execute()
+    return [json.dumps(cell.outputs) for cell in nb.cells]
+
+def build_notebook(py_file, ipynb_file, cache_dir=CACHE_DIR, workers=None, timeout=600):
+    """Write an executed notebook, running only the cells whose hash is not cached."""
+    start = time.time()
+    base_dir = os.path.dirname(os.path.abspath(py_file))
+    with open(py_file, 'r') as f:
+        cells = main_steps(split_cells(f.read()))
+
+    infos = [CellInfo(source, base_dir) if cell_type == 'code' else None for source, cell_type in cells]
+    deps = dependencies(infos)
+    hashes = cell_hashes(cells, infos, deps, base_dir)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = {}
+    for h in set(hashes):
+        path = os.path.join(cache_dir, h + '.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                cached[h] = json.load(f)
+    code = [i for i, info in enumerate(infos) if info is not None]
+    changed = [i for i in code if hashes[i] not in cached]
+
+    # Changed cells that no other changed cell needs each start a job with
+    # their dependencies; the jobs are dealt out to the kernels
+    needed_by_others = set()
+    for i in changed:
+        needed_by_others |= closure(i, deps) - {i}
+    jobs = [closure(i, deps) for i in changed if i not in needed_by_others]
+    kernels = [set() for _ in range(min(workers or os.cpu_count() or 1, len(jobs)))]
+    for n, job in enumerate(jobs):
+        kernels[n % len(kernels)] |= job
+
+    if kernels:
+        groups = [sorted(kernel) for kernel in kernels]
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(execute_cells, [cells[i][0] for i in group], base_dir, timeout)
+                       for group in groups]
+            for group, future in zip(groups, futures):
+                for i, outputs in zip(group, future.result()):
+                    if i in changed and hashes[i] not in cached:
+                        cached[hashes[i]] = json.loads(outputs)
+                        with open(os.path.join(cache_dir, hashes[i] + '.json'), 'w') as f:
+                            f.write(outputs)
+
+    # Assemble the notebook from cached outputs, numbered in order
+    nb = nbf.v4.new_notebook()
+    nb.metadata['kernelspec'] = {'name': KERNEL_NAME, 'display_name': 'Python 3', 'language': 'python'}
+    count = 0
+    for (source, cell_type), h in zip(cells, hashes):
+        if cell_type == 'markdown':
+            nb.cells.append(nbf.v4.new_markdown_cell(source))
+            continue
+        count += 1
+        outputs = [nbf.from_dict(output) for output in cached[h]]
+        for output in outputs:
+            if 'execution_count' in output:
+                output['execution_count'] = count
+        nb.cells.append(nbf.v4.new_code_cell(source, execution_count=count, outputs=outputs))
+    with open(ipynb_file, 'w') as f:
+        nbf.write(nb, f)
+
+    # Drop outputs of cells that no longer exist
+    current = {h + '.json' for h in hashes}
+    for name in os.listdir(cache_dir):
+        if name.endswith('.json') and name not in current:
+            os.remove(os.path.join(cache_dir, name))
+
+    print(f"Built {ipynb_file} in {time.time() - start:.1f}s: {len(changed)} of {len(code)} code cells "
+          f"changed, {sum(len(k) for k in kernels)} executed in {len(kernels)} kernel(s)")
+    return nb
+
 if __name__ == "__main__":
-    create_notebook_from_py('insightplate_analysis.py', 'Final-InsightPlate.ipynb')
+    parser = argparse.ArgumentParser(description='Convert insightplate_analysis.py to Final-InsightPlate.ipynb')
+    parser.add_argument('--build', action='store_true',
+                        help='execute the notebook, re-running only the cells that changed')
+    parser.add_argument('--workers', type=int, help='kernels run in parallel (default: all cores)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='directory of the cached cell outputs')
+    args = parser.parse_args()
+
+    if args.build:
+        build_notebook('insightplate_analysis.py', 'Final-InsightPlate.ipynb', args.cache_dir, args.workers)
+    else:
+        create_notebook_from_py('insightplate_analysis.py', 'Final-InsightPlate.ipynb')
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single typed loader for the FoodPanda restaurant data.
+
+The dashboard (`FinalCode.load_data`), the merge step (`merge_csv_files`,
+`merge_csv.py`) and the analysis script (`load_and_clean_data`) all load
+their CSVs through `load_restaurants`, so they share one cleaning routine
+and one explicit schema:
+
+- City, FoodType, Location and Snapshot are categoricals
+- AverageRating is float32
+- Reviewers buckets such as "(100+)" are parsed to the smallest unsigned
+  integer type that holds them
+- the free-text name columns use the compact string dtype
+
+A file whose snapshot was written from such a typed frame is loaded from
+the memory-mapped snapshot as it is, without cleaning or casting it again.
+"""
+
+import pandas as pd
+
+from snapshot import read_snapshot, read_table
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    STRING_DTYPE = pd.StringDtype()
+
+SCHEMA = {
+    'StoreId': STRING_DTYPE,
+    'StoreName': STRING_DTYPE,
+    'CompleteStoreName': STRING_DTYPE,
+    'FoodType': 'category',
+    'AverageRating': 'float32',
+    'Reviewers': 'reviewers',  # parsed by parse_reviewers
+    'City': 'category',
+    'Location': 'category',
+    'Snapshot': 'category',
+}
+
+
+def parse_reviewers(values):
+    """Convert Reviewers values such as "(100+)", "12" or 12 to small unsigned integers.
+
+    Unparseable or missing values become 0.
+    """
+    if not pd.api.types.is_numeric_dtype(values):
+        cleaned = values.astype(str).str.replace(r'[()+,]', '', regex=True)
+        values = pd.to_numeric(cleaned, errors='coerce')
+    values = values.fillna(0).clip(lower=0)
+    return pd.to_numeric(values.round().astype('int64'), downcast='unsigned')
+
+
+def memory_usage(df):
+    """Deep memory usage of `df` in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def apply_schema(df):
+    """Cast the known columns of `df` to SCHEMA; other columns are left alone."""
+    casts = {}
+    for column, dtype in SCHEMA.items():
+        if column not in df.columns:
+            continue
+        if dtype == 'reviewers':
+            casts[column] = parse_reviewers(df[column])
+        elif dtype == 'category' and isinstance(df[column].dtype, pd.CategoricalDtype):
+            continue
+        else:
+            casts[column] = df[column].astype(dtype)
+    return df.assign(**casts)
+
+
+def clean_restaurants(df):
+    """Standard cleaning shared by every load path, followed by the schema casts."""
+    df = df.dropna(subset=['FoodType'])
+    df = df.assign(City=df['City'].str.title(), FoodType=df['FoodType'].str.strip())
+    df = df.drop_duplicates()
+    return apply_schema(df).reset_index(drop=True)
+
+
+def load_restaurants(paths, drop_columns=(), report=False):
+    """Load, combine and clean restaurant CSVs into the typed schema.
+
+    Each file is read through its columnar snapshot when one is present.
+
+    Args:
+        paths: CSV files to combine, in order.
+        drop_columns: Columns to drop before deduplicating.
+        report: Print the memory used before and after the schema casts.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if len(paths) == 1 and not drop_columns:
+        # Already cleaned and typed when the snapshot was written
+        df = read_snapshot(paths[0], typed_only=True)
+        if df is not None:
+            if report:
+                print(f"Loaded {len(df)} rows from the typed snapshot ({memory_usage(df) / 1e6:.1f} MB)")
+            return df
+
+    frames = [read_table(path).drop(columns=list(drop_columns), errors='ignore') for path in paths]
+    raw = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df = clean_restaurants(raw)
+
+    if report:
+        before, after = memory_usage(raw), memory_usage(df)
+        print(f"Loaded {len(df)} rows: {before / 1e6:.1f} MB as parsed -> "
+              f"{after / 1e6:.1f} MB typed ({before / max(after, 1):.1f}x smaller)")
+    return df
+
+
+def concat_restaurants(frames):
+    """Concatenate frames that already follow SCHEMA, e.g. the data and a cleaned delta.
+
+    Nothing is parsed or cast again: each categorical column only gets the
+    sorted union of the frames' categories, so the frames differ in their
+    codes alone and concatenate as categoricals.
+    """
+    frames = list(frames)
+    for column, dtype in SCHEMA.items():
+        if dtype != 'category' or not all(column in f.columns for f in frames):
+            continue
+        categories = frames[0][column].cat.categories
+        for f in frames[1:]:
+            categories = categories.union(f[column].cat.categories)
+        frames = [f if f[column].cat.categories.equals(categories)
+                  else f.assign(**{column: f[column].cat.set_categories(categories)})
+                  for f in frames]
+    return pd.concat(frames, ignore_index=True)
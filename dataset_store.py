@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Process-wide dataset holder for the InsightPlate dashboard.
+
+The combined CSV is loaded and cleaned once, then handed out as a versioned
+snapshot. A background watcher polls the source file's mtime and size and
+rebuilds the snapshot when the file changes. The rebuilt snapshot replaces the
+old one with a single reference swap, so callbacks already running keep the
+snapshot they started with and never see a half-built frame.
+
+When the source only grew (rows appended by `ingest.py`) and an
+`append_loader` is configured, only the new bytes are read and artifacts that
+know how to update themselves (an `updated(added, removed)` method) are
+updated from the delta instead of being rebuilt. The new frame is the old one
+without the `removed` rows, which are indexed by their old row positions,
+followed by the `added` rows. The filter and name indexes and the aggregate
+cube update this way. The leaderboard is still rebuilt, because its prior
+comes from the whole dataset, and so is the per-city coordinate table, whose
+cost follows the number of distinct cities. Dropping the superseded rows
+also copies the frame once.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+
+def file_version(path, st=None):
+    """Return a version token for `path` built from its mtime and size."""
+    st = st or os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _tail_digest(path, end, length=4096):
+    """Hash of the `length` bytes before offset `end`, to tell appends from rewrites."""
+    with open(path, 'rb') as f:
+        f.seek(max(0, end - length))
+        return hashlib.sha1(f.read(min(end, length))).hexdigest()
+
+
+class DatasetSnapshot:
+    """An immutable, versioned view of the cleaned dataset.
+
+    `df` is shared by every caller holding this snapshot and must be treated
+    as read-only. `artifacts` holds the derived structures (indexes,
+    aggregates) that were built for this exact version of the data.
+    """
+
+    __slots__ = ('version', 'df', 'artifacts', 'loaded_at', 'size', 'tail_digest')
+
+    def __init__(self, version, df, artifacts=None, size=None, tail_digest=None):
+        self.version = version
+        self.df = df
+        self.artifacts = artifacts or {}
+        self.loaded_at = time.time()
+        # How far into the source file this snapshot has read
+        self.size = size
+        self.tail_digest = tail_digest
+
+    def frame(self):
+        """Return a shallow copy of the data that callers may add columns to."""
+        return self.df.copy(deep=False)
+
+    def __repr__(self):
+        return f"DatasetSnapshot(version={self.version!r}, rows={len(self.df)})"
+
+
+class DatasetStore:
+    """Load a dataset once and hot-swap it when the source file changes.
+
+    Args:
+        path: Source file to watch.
+        loader: Callable taking `path` and returning the cleaned DataFrame.
+        poll_interval: Seconds between mtime/size checks while watching.
+        append_loader: Optional callable `(path, offset, df)` returning
+            `(new_df, added, removed)` from the bytes appended after `offset`.
+    """
+
+    def __init__(self, path, loader, poll_interval=5.0, append_loader=None):
+        self.path = path
+        self.loader = loader
+        self.append_loader = append_loader
+        self.poll_interval = poll_interval
+        self._artifact_builders = {}
+        self._current = None
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._on_reload = None
+
+    def register_artifact(self, name, builder):
+        """Build `builder(df)` once per dataset version and store it as `name`.
+
+        Artifacts are built in the same pass as the frame, so a snapshot and
+        its indexes are always swapped in together.
+        """
+        self._artifact_builders[name] = builder
+        current = self._current
+        if current is not None and name not in current.artifacts:
+            current.artifacts[name] = builder(current.df)
+
+    def get(self):
+        """Return the current snapshot, loading it on first use."""
+        current = self._current
+        if current is None:
+            with self._build_lock:
+                if self._current is None:
+                    self._current = self._build()
+            current = self._current
+        return current
+
+    @property
+    def version(self):
+        return self.get().version
+
+    def refresh(self):
+        """Rebuild the snapshot if the source file changed; return True if swapped."""
+        current = self._current
+        try:
+            version = file_version(self.path)
+        except OSError:
+            return False
+        if current is not None and version == current.version:
+            return False
+        with self._build_lock:
+            current = self._current
+            if current is not None and current.version == version:
+                return False
+            snapshot = self._build_appended(current) if self._is_append(current) else self._build()
+            # A writer may still be appending to the file; only publish a
+            # snapshot whose source did not move underneath the build.
+            if file_version(self.path) != snapshot.version:
+                return False
+            self._current = snapshot
+        return True
+
+    def _build(self):
+        st = os.stat(self.path)
+        df = self.loader(self.path)
+        artifacts = {name: builder(df) for name, builder in self._artifact_builders.items()}
+        return DatasetSnapshot(file_version(self.path, st), df, artifacts,
+                               size=st.st_size, tail_digest=_tail_digest(self.path, st.st_size))
+
+    def _is_append(self, current):
+        """True if the source only had bytes appended since `current` was read."""
+        if self.append_loader is None or current is None or current.size is None:
+            return False
+        if os.stat(self.path).st_size <= current.size:
+            return False
+        return _tail_digest(self.path, current.size) == current.tail_digest
+
+    def _build_appended(self, current):
+        st = os.stat(self.path)
+        df, added, removed = self.append_loader(self.path, current.size, current.df)
+        artifacts = {}
+        for name, builder in self._artifact_builders.items():
+            artifact = current.artifacts.get(name)
+            if hasattr(artifact, 'updated'):
+                artifacts[name] = artifact.updated(added, removed)
+            else:
+                artifacts[name] = builder(df)
+        return DatasetSnapshot(file_version(self.path, st), df, artifacts,
+                               size=st.st_size, tail_digest=_tail_digest(self.path, st.st_size))
+
+    def start_watching(self, on_reload=None):
+        """Start the background thread that reloads the data when the file changes.
+
+        `on_reload(snapshot)` is called after each swap, e.g. to tell a
+        pre-fork server to replace its workers with ones sharing the new data.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._on_reload = on_reload
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name='dataset-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def after_fork(self):
+        """Reset thread state in a forked child; the snapshot itself is inherited.
+
+        Threads do not survive fork and a lock held by the parent's watcher
+        would stay locked forever in the child, so both are recreated. The
+        inherited frame is shared copy-on-write with the parent.
+        """
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._on_reload = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.refresh():
+                    print(f"Dataset reloaded from {self.path} (version {self._current.version})")
+                    if self._on_reload is not None:
+                        self._on_reload(self._current)
+            except Exception as e:
+                # Keep serving the previous snapshot until the file is readable again
+                print(f"Error reloading {self.path}: {str(e)}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+2D binned Reviewers x AverageRating density.
+
+Instead of one marker per restaurant, the two columns are binned into a
+fixed grid with one vectorized `np.histogram2d`. The analysis script draws
+the grid as a heatmap and the dashboard sends it to the browser. Either way
+the cost of drawing does not depend on the number of rows. Reviewer counts
+are heavily skewed, so the reviewer axis can use logarithmic bins.
+`rating_histogram` does the same for the 1D rating histogram.
+"""
+
+import numpy as np
+
+REVIEWER_BINS = 40
+RATING_BINS = 20
+MAX_RATING = 5.0
+
+
+class DensityGrid:
+    """Counts of restaurants per (rating bin, reviewer bin)."""
+
+    __slots__ = ('counts', 'reviewer_edges', 'rating_edges', 'log_reviewers')
+
+    def __init__(self, counts, reviewer_edges, rating_edges, log_reviewers):
+        self.counts = counts
+        self.reviewer_edges = reviewer_edges
+        self.rating_edges = rating_edges
+        self.log_reviewers = log_reviewers
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def reviewer_labels(self):
+        """Readable bin labels such as '12-24' for the reviewer axis; one per bin, all distinct.
+
+        Reviewer edges are integers, so a bin [lo, hi) holds the counts lo to
+        hi - 1 (the last bin also holds hi).
+        """
+        edges = self.reviewer_edges.astype('int64')
+        highs = edges[1:] - 1
+        highs[-1] += 1
+        return [f"{lo}" if lo == hi else f"{lo}-{hi}" for lo, hi in zip(edges[:-1], highs)]
+
+    def rating_centers(self):
+        return (self.rating_edges[:-1] + self.rating_edges[1:]) / 2
+
+
+def reviewer_edges(top, bins=REVIEWER_BINS, log=False):
+    """Bin edges from 0 to `top` reviewers; evenly spaced in log(1 + x) when `log`.
+
+    Reviewer counts are integers, so the edges are snapped to distinct
+    integers: narrow bins that would hold no integer are merged, and there
+    may be fewer than `bins` bins.
+    """
+    top = np.ceil(max(float(top), 1.0))
+    if log:
+        edges = np.expm1(np.linspace(0, np.log1p(top), bins + 1))
+    else:
+        edges = np.linspace(0, top, bins + 1)
+    return np.unique(np.round(edges))
+
+
+def review_rating_grid(reviewers, ratings, reviewer_bins=REVIEWER_BINS, rating_bins=RATING_BINS,
+                       log_reviewers=False, reviewer_max=None):
+    """Bin (Reviewers, AverageRating) pairs into a `rating_bins` x `reviewer_bins` grid.
+
+    Rows with a missing value in either column are skipped. `reviewer_max`
+    fixes the right edge, e.g. so grids of different selections line up.
+    """
+    x = np.asarray(reviewers, dtype='float64')
+    y = np.asarray(ratings, dtype='float64')
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+
+    top = reviewer_max if reviewer_max is not None else (x.max() if len(x) else 1.0)
+    x_edges = reviewer_edges(top, reviewer_bins, log_reviewers)
+    y_edges = np.linspace(0, MAX_RATING, rating_bins + 1)
+    counts, _, _ = np.histogram2d(y, x, bins=[y_edges, x_edges])
+    return DensityGrid(counts.astype('int64'), x_edges, y_edges, log_reviewers)
+
+
+def rating_histogram(ratings, bins=RATING_BINS):
+    """Counts of `ratings` in `bins` fixed-width bins from 0 to 5; returns (counts, edges)."""
+    values = np.asarray(ratings, dtype='float64')
+    edges = np.linspace(0, MAX_RATING, bins + 1)
+    counts, _ = np.histogram(values[np.isfinite(values)], bins=edges)
+    return counts.astype('int64'), edges
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Precomputed filter index for the dashboard dropdowns.
+
+For each filterable column (City, FoodType and the rating bucket) the index
+keeps the integer code of every row and, per value, the sorted row ids having
+that value. A filter starts from the smallest matching row-id set and checks
+the other dimensions through their code arrays, then the frame is sliced once.
+That avoids copying the frame and scanning full columns on every dropdown
+change. It also supports selecting several values per dimension.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Rating buckets offered by the rating dropdown, as [low, high) intervals
+RATING_RANGES = {
+    '4.5+': (4.5, np.inf),
+    '4.0-4.4': (4.0, 4.5),
+    '3.5-3.9': (3.5, 4.0),
+    'Below 3.5': (-np.inf, 3.5),
+}
+
+
+def rating_bucket_codes(ratings):
+    """Return the RATING_RANGES position of every rating, or -1 for missing ratings."""
+    ratings = np.asarray(ratings, dtype='float64')
+    codes = np.full(len(ratings), -1, dtype='int8')
+    for code, (low, high) in enumerate(RATING_RANGES.values()):
+        codes[(ratings >= low) & (ratings < high)] = code
+    return codes
+
+
+def normalize_selection(value):
+    """Turn a dropdown value into a tuple of selected values, or None for no filter.
+
+    Accepts a single value or a list from a multi-select dropdown. 'All' and
+    empty selections mean "do not filter on this column".
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    selected = tuple(sorted({v for v in value if v != 'All'}))
+    return selected or None
+
+
+class _Dimension:
+    """Codes and per-value row ids for one filterable column."""
+
+    def __init__(self, codes, labels):
+        self.codes = codes
+        self.labels = list(labels)
+        self.positions = {label: i for i, label in enumerate(self.labels)}
+
+        # Group row ids by code with one stable sort; rows stay ascending per value
+        valid = codes >= 0
+        order = np.flatnonzero(valid)[np.argsort(codes[valid], kind='stable')]
+        counts = np.bincount(codes[valid], minlength=len(self.labels))
+        self.rows = np.split(order, np.cumsum(counts)[:-1])
+
+    def merged(self, other, keep):
+        """Return the dimension of the rows where `keep` is True followed by the rows of `other`.
+
+        New labels of `other` are merged in sorted order, and the row ids of
+        each label are renumbered rather than grouped again.
+        """
+        new_labels = [label for label in other.labels if label not in self.positions]
+        labels = sorted(self.labels + new_labels) if new_labels else self.labels
+        positions = {label: i for i, label in enumerate(labels)}
+        # Map codes to positions in the merged labels; -1 stays -1
+        remap = np.array([positions[label] for label in self.labels] + [-1], dtype='int32')
+        other_remap = np.array([positions[label] for label in other.labels] + [-1], dtype='int32')
+
+        dim = _Dimension.__new__(_Dimension)
+        dim.codes = np.concatenate([remap[self.codes[keep]], other_remap[other.codes]])
+        dim.labels = labels
+        dim.positions = positions
+        dim.rows = [np.empty(0, dtype=np.intp) for _ in labels]
+        new_positions = np.cumsum(keep) - 1
+        for label, rows in zip(self.labels, self.rows):
+            dim.rows[positions[label]] = new_positions[rows[keep[rows]]]
+        offset = keep.sum()
+        for label, rows in zip(other.labels, other.rows):
+            i = positions[label]
+            dim.rows[i] = np.concatenate([dim.rows[i], rows + offset])
+        return dim
+
+    def lookup(self, selected):
+        """Return the codes of the selected labels that exist in the data."""
+        return [self.positions[v] for v in selected if v in self.positions]
+
+    def mask(self, codes):
+        """Return a lookup table that is True for `codes`; index -1 (missing) maps to False."""
+        allowed = np.zeros(len(self.labels) + 1, dtype=bool)
+        allowed[codes] = True
+        return allowed
+
+
+class FilterIndex:
+    """Row-id index over City, FoodType and rating bucket for one dataset version."""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.dimensions = {
+            'City': self._categorical(df['City']),
+            'FoodType': self._categorical(df['FoodType']),
+            'RatingRange': _Dimension(rating_bucket_codes(df['AverageRating']), RATING_RANGES),
+        }
+
+    def updated(self, added, removed):
+        """Return the index with the `removed` rows dropped and the `added` rows appended.
+
+        `removed` is indexed by row position (see `ingest.apply_upserts`);
+        only the `added` rows are grouped by value.
+        """
+        keep = np.ones(self.n_rows, dtype=bool)
+        keep[removed.index.to_numpy()] = False
+        delta = FilterIndex(added)
+        index = FilterIndex.__new__(FilterIndex)
+        index.n_rows = int(keep.sum()) + delta.n_rows
+        index.dimensions = {name: dim.merged(delta.dimensions[name], keep)
+                            for name, dim in self.dimensions.items()}
+        return index
+
+    @staticmethod
+    def _categorical(column):
+        codes, labels = pd.factorize(column, sort=True)
+        return _Dimension(codes.astype('int32'), labels)
+
+    def rows(self, city=None, food_type=None, rating_range=None):
+        """Return the sorted row positions matching the filters, or None for all rows.
+
+        Each argument may be a single value, a list of values, 'All' or None.
+        """
+        filters = []
+        for name, value in (('City', city), ('FoodType', food_type), ('RatingRange', rating_range)):
+            selected = normalize_selection(value)
+            if selected is None:
+                continue
+            dim = self.dimensions[name]
+            codes = dim.lookup(selected)
+            size = sum(len(dim.rows[c]) for c in codes)
+            filters.append((size, dim, codes))
+
+        if not filters:
+            return None
+
+        # Start from the most selective dimension and check the rest by code
+        filters.sort(key=lambda f: f[0])
+        _, dim, codes = filters[0]
+        if len(codes) == 1:
+            rows = dim.rows[codes[0]]
+        else:
+            rows = np.sort(np.concatenate([dim.rows[c] for c in codes] or [np.empty(0, dtype=np.intp)]))
+        for _, dim, codes in filters[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[dim.mask(codes)[dim.codes[rows]]]
+        return rows
+
+    def matches(self, rows, city=None, food_type=None, rating_range=None):
+        """Return a boolean mask of the positions in `rows` (any order) that match the filters.
+
+        Used to combine the filters with candidates from another index, such
+        as name search hits, without materializing the filtered row set.
+        """
+        rows = np.asarray(rows)
+        keep = np.ones(len(rows), dtype=bool)
+        for name, value in (('City', city), ('FoodType', food_type), ('RatingRange', rating_range)):
+            selected = normalize_selection(value)
+            if selected is None:
+                continue
+            dim = self.dimensions[name]
+            keep &= dim.mask(dim.lookup(selected))[dim.codes[rows]]
+        return keep
+
+    def present_values(self, rows=None):
+        """Return the sorted City and FoodType values occurring in `rows` (None for all rows)."""
+        values = {}
+        for name in ('City', 'FoodType'):
+            dim = self.dimensions[name]
+            codes = dim.codes if rows is None else dim.codes[rows]
+            counts = np.bincount(codes[codes >= 0], minlength=len(dim.labels))
+            values[name] = [dim.labels[i] for i in np.flatnonzero(counts)]
+        return values
+
+    def select(self, df, city=None, food_type=None, rating_range=None):
+        """Return the rows of `df` (the frame this index was built from) matching the filters."""
+        rows = self.rows(city, food_type, rating_range)
+        if rows is None:
+            return df
+        return df.iloc[rows]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Offline city coordinates for the restaurant map.
+
+Coordinates come from `gazetteer.csv` (City, Latitude, Longitude, Aliases,
+Province), keyed by a normalized form of the city name: lower case, no
+accents or punctuation. Scraped names that do not match exactly, such as
+"Davao City" or "Las Piñas", are resolved through the aliases, then by word
+prefix, then by fuzzy matching. A word prefix only counts when the rest of
+the name is the known city's province or region ("Bacoor City Cavite",
+"Makati City Metro Manila"); "San Juan Batangas" or "Manila Bay" are left
+unmapped and reported rather than placed on the wrong city. Each distinct
+name is resolved once and cached. `city_table` builds the coordinates of a dataset's distinct
+cities once, and aggregates are joined to it, so no per-row Python code runs.
+"""
+
+import difflib
+import os
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv')
+
+
+def normalize_city(name):
+    """Lower-case `name` and strip accents and punctuation ("Las Piñas City" -> "las pinas city")."""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = ''.join(ch if ch.isalnum() else ' ' for ch in text)
+    return ' '.join(text.split())
+
+
+class Gazetteer:
+    """City name -> (Latitude, Longitude) lookup backed by a local CSV file."""
+
+    def __init__(self, path=GAZETTEER_FILE):
+        table = pd.read_csv(path, keep_default_na=False)
+        self.coordinates = {}
+        self.provinces = {}  # known name -> normalized provinces/regions it lies in
+        for row in table.itertuples(index=False):
+            point = (float(row.Latitude), float(row.Longitude))
+            provinces = {normalize_city(p) for p in row.Province.split('|') if p}
+            for name in [row.City] + [a for a in row.Aliases.split('|') if a]:
+                key = normalize_city(name)
+                if key not in self.coordinates:
+                    self.coordinates[key] = point
+                    self.provinces[key] = provinces
+        self._names = sorted(self.coordinates, key=len, reverse=True)
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def _lookup(self, name):
+        """Return (lat, lon) for a city name, or None if it cannot be placed."""
+        key = normalize_city(name)
+        if key in self.coordinates:
+            return self.coordinates[key]
+
+        # "Bacoor City Cavite" -> longest known name that starts it and is
+        # followed by its own province; any other suffix is a different place
+        prefixed = False
+        for known in self._names:
+            if key.startswith(known + ' '):
+                if key[len(known) + 1:] in self.provinces[known]:
+                    return self.coordinates[known]
+                prefixed = True
+        if prefixed:
+            return None
+
+        close = difflib.get_close_matches(key, self._names, n=1, cutoff=0.85)
+        return self.coordinates[close[0]] if close else None
+
+    def city_table(self, cities):
+        """Return a City-indexed frame of Latitude/Longitude for the distinct values of `cities`."""
+        labels = pd.Series(cities).astype('category').cat.categories
+        points = [self.lookup(label) or (np.nan, np.nan) for label in labels]
+        table = pd.DataFrame(points, index=pd.Index(labels, name='City'),
+                             columns=['Latitude', 'Longitude'], dtype='float64')
+
+        unmapped = table.index[table['Latitude'].isna()]
+        if len(unmapped):
+            print(f"No coordinates for: {', '.join(map(str, unmapped))} (add them to {os.path.basename(GAZETTEER_FILE)})")
+        return table
+
+
+gazetteer = Gazetteer()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn settings for serving the dashboard with several workers.
+
+    gunicorn -c gunicorn.conf.py
+
+The dataset is loaded in the master (preload_app) and shared by the forked
+workers. Only the master watches FoodpandaCombo.csv: after it swaps in new
+data it sends itself SIGHUP, which replaces the workers with fresh forks
+that share the new snapshot instead of each worker reloading its own copy.
+
+Every worker records its own callback timings. They are written to files
+under INSIGHTPLATE_METRICS_DIR (a new temporary directory unless set) and
+merged when /metrics is scraped, so any worker answers with the totals of
+all of them. The file of a worker that exits is removed with it.
+"""
+
+import gc
+import multiprocessing
+import os
+import signal
+import tempfile
+
+wsgi_app = 'wsgi:server'
+bind = os.environ.get('INSIGHTPLATE_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+preload_app = True
+timeout = 60
+
+# Set before the app is preloaded, so metrics.py picks it up in the master and
+# every worker; kept across SIGHUP reloads, which read this file again
+if 'INSIGHTPLATE_METRICS_DIR' not in os.environ:
+    os.environ['INSIGHTPLATE_METRICS_DIR'] = tempfile.mkdtemp(prefix='insightplate-metrics-')
+
+
+def when_ready(server):
+    from wsgi import dataset_store, warm_up
+
+    def replace_workers(snapshot):
+        # Render the default view of the new data once, before the new forks
+        warm_up()
+        gc.freeze()
+        os.kill(os.getpid(), signal.SIGHUP)
+
+    dataset_store.start_watching(on_reload=replace_workers)
+
+
+def post_fork(server, worker):
+    # Locks held by the master's reload watcher (e.g. during warm_up) at the
+    # moment of the fork would never be released in the worker
+    from wsgi import after_fork
+    after_fork()
+
+
+def child_exit(server, worker):
+    # Take the exited worker's timings out of the merged /metrics totals
+    from metrics import metrics
+    metrics.remove_process(worker.pid)
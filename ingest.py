@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Incremental ingestion of new scrape snapshots into FoodpandaCombo.csv.
+
+The combined store is append-only. Ingesting a snapshot compares each of its
+rows, by StoreId, against a small key manifest (`FoodpandaCombo.keys.csv`:
+StoreId, row fingerprint, snapshot name). Only new or changed rows are
+appended to the store, tagged with the snapshot they came from. Readers keep
+the latest row per StoreId (`latest_rows`), so an appended row supersedes the
+older one without rewriting the history. `--compact` rewrites the store
+without superseded rows when it has grown too much.
+
+Usage:
+    python ingest.py restos_2025.csv
+    python ingest.py --compact
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import concat_restaurants, parse_reviewers
+from merge_csv import OUTPUT, normalize_chunk
+
+KEY = 'StoreId'
+SNAPSHOT_COLUMN = 'Snapshot'
+BASELINE_SNAPSHOT = 'baseline'
+
+
+def manifest_path(store):
+    """Return the key manifest file that belongs to `store`."""
+    return os.path.splitext(store)[0] + '.keys.csv'
+
+
+def latest_rows(df):
+    """Keep only the newest row per StoreId of an ingest-managed store.
+
+    The baseline rows (the merged store as it was before the first ingest)
+    may hold several rows per StoreId, one per source file. They are only
+    superseded by ingested rows, never by each other, so tagging a merged
+    store as the baseline does not change its rows.
+    """
+    if SNAPSHOT_COLUMN not in df.columns:
+        return df
+    ingested = (df[SNAPSHOT_COLUMN] != BASELINE_SNAPSHOT).to_numpy()
+    if not ingested.any():
+        return df
+    newest = ~df.duplicated(subset=KEY, keep='last').to_numpy()
+    superseded = df[KEY].isin(df.loc[ingested, KEY]).to_numpy()
+    return df[np.where(ingested, newest, ~superseded)]
+
+
+def _canonical_text(column):
+    """Text of a column with numbers spelled one way ("5", "5.0" and 5 all become "5.0")."""
+    text = column.astype(object).where(column.notna(), '').astype(str)
+    numbers = pd.to_numeric(column, errors='coerce').astype('float64')
+    return text.where(numbers.isna(), numbers.astype(str))
+
+
+def row_fingerprints(df):
+    """64-bit hash of every row's canonical text, ignoring the Snapshot tag.
+
+    Reviewers and AverageRating are parsed as the loader parses them first,
+    so a raw snapshot ("(100+)", "4.8") and the merged store it was written
+    to (100, 4.8 as float32) give the same fingerprints.
+    """
+    data = df.drop(columns=[SNAPSHOT_COLUMN], errors='ignore')
+    if 'Reviewers' in data.columns:
+        data = data.assign(Reviewers=parse_reviewers(data['Reviewers']))
+    if 'AverageRating' in data.columns:
+        data = data.assign(AverageRating=pd.to_numeric(data['AverageRating'], errors='coerce').astype('float32'))
+    data = data.apply(_canonical_text)
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+def read_appended(path, offset):
+    """Read the rows written to a CSV after byte `offset`, with the file's header."""
+    columns = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return pd.read_csv(f, header=None, names=columns)
+
+
+def apply_upserts(df, delta):
+    """Replace the rows of `df` whose StoreId appears in `delta` and append `delta`.
+
+    Returns (new_df, removed_rows). `new_df` is `df` without the removed rows
+    followed by `delta`, and `removed_rows` is indexed by the row positions
+    it had in `df`, so indexes over `df` can be updated instead of rebuilt.
+    """
+    superseded = df[KEY].isin(delta[KEY]).to_numpy()
+    removed = df[superseded].set_axis(np.flatnonzero(superseded))
+    kept = df[~superseded] if superseded.any() else df
+    new_df = concat_restaurants([kept, delta])
+    return new_df, removed
+
+
+def _write_manifest(manifest, store, mode='w'):
+    manifest.to_csv(manifest_path(store), mode=mode, header=mode == 'w', index=False)
+
+
+def load_manifest(store):
+    """Return the manifest entries of the store's current rows, bootstrapping it if needed."""
+    path = manifest_path(store)
+    if not os.path.exists(path):
+        return _bootstrap(store)
+    manifest = pd.read_csv(path, dtype={KEY: str, 'Fingerprint': 'uint64', SNAPSHOT_COLUMN: str})
+    return latest_rows(manifest)
+
+
+def _bootstrap(store):
+    """One-off pass over an existing store: tag it and build its key manifest."""
+    df = pd.read_csv(store, dtype=str)
+    if SNAPSHOT_COLUMN not in df.columns:
+        print(f"Tagging the existing rows of {store} as snapshot '{BASELINE_SNAPSHOT}'")
+        df[SNAPSHOT_COLUMN] = BASELINE_SNAPSHOT
+        df.to_csv(store, index=False)
+    # Fingerprint the rows the way upsert_snapshot normalizes incoming ones
+    df = latest_rows(normalize_chunk(df.dropna(subset=[KEY])))
+    manifest = pd.DataFrame({KEY: df[KEY].to_numpy(),
+                             'Fingerprint': row_fingerprints(df),
+                             SNAPSHOT_COLUMN: df[SNAPSHOT_COLUMN].to_numpy()})
+    _write_manifest(manifest, store)
+    return manifest
+
+
+def upsert_snapshot(snapshot_file, store=OUTPUT, name=None):
+    """Merge one scrape snapshot into the combined store by StoreId.
+
+    Only rows that are new or differ from the stored row are appended to the
+    store and the manifest; nothing already written is rewritten. Returns the
+    appended rows.
+    """
+    name = name or os.path.basename(snapshot_file)
+    new = pd.read_csv(snapshot_file, dtype=str)
+
+    if os.path.exists(store):
+        manifest = load_manifest(store)
+        columns = list(pd.read_csv(store, nrows=0).columns)
+    else:
+        manifest = pd.DataFrame({KEY: pd.Series(dtype=str),
+                                 'Fingerprint': pd.Series(dtype='uint64'),
+                                 SNAPSHOT_COLUMN: pd.Series(dtype=str)})
+        columns = list(new.columns) + [SNAPSHOT_COLUMN]
+
+    ignored = [c for c in new.columns if c not in columns]
+    if ignored:
+        print(f"Ignoring columns not in {store}: {', '.join(ignored)}")
+
+    data_columns = [c for c in columns if c != SNAPSHOT_COLUMN]
+    new = normalize_chunk(new.reindex(columns=data_columns).dropna(subset=[KEY]))
+    new = new.drop_duplicates(subset=KEY, keep='last')
+    fingerprints = row_fingerprints(new)
+
+    # New keys are absent from the manifest; changed keys match none of the
+    # current rows of their key (baseline keys can have several)
+    known = new[KEY].isin(manifest[KEY]).to_numpy()
+    current = pd.MultiIndex.from_arrays([manifest[KEY], manifest['Fingerprint']])
+    changed = ~pd.MultiIndex.from_arrays([new[KEY], fingerprints]).isin(current)
+
+    delta = new[changed].assign(**{SNAPSHOT_COLUMN: name})[columns]
+    if len(delta):
+        write_header = not os.path.exists(store)
+        delta.to_csv(store, mode='a', header=write_header, index=False)
+        _write_manifest(pd.DataFrame({KEY: delta[KEY].to_numpy(),
+                                      'Fingerprint': fingerprints[changed],
+                                      SNAPSHOT_COLUMN: name}),
+                        store, mode='w' if write_header else 'a')
+
+    print(f"Ingested {name}: {int((~known).sum())} new, {int((changed & known).sum())} changed, "
+          f"{int((~changed).sum())} unchanged rows")
+    return delta
+
+
+def compact(store=OUTPUT):
+    """Rewrite the store and its manifest without superseded rows."""
+    df = pd.read_csv(store, dtype=str)
+    before = len(df)
+    df = latest_rows(df)
+    df.to_csv(store, index=False)
+    _bootstrap(store)
+    print(f"Compacted {store}: {before} -> {len(df)} rows")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Upsert scrape snapshots into the combined restaurant store')
+    parser.add_argument('snapshots', nargs='*', help='snapshot CSV files, oldest first')
+    parser.add_argument('--store', default=OUTPUT, help='combined store to update')
+    parser.add_argument('--compact', action='store_true', help='drop superseded rows from the store')
+    args = parser.parse_args()
+
+    for snapshot_file in args.snapshots:
+        upsert_snapshot(snapshot_file, store=args.store)
+    if args.compact:
+        compact(args.store)
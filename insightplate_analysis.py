@@ -10,57 +10,56 @@ across Philippine cities. It can be run directly or converted to a Jupyter noteb
 """
 
 # Import required libraries
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.colors import LogNorm
 from matplotlib.gridspec import GridSpec
 
+from aggregations import aggregates
+from data_loader import load_restaurants
+from density import review_rating_grid
+from leaderboard import MIN_REVIEWERS, Leaderboard
+
+# Above this many rows the reviews-vs-rating panel is binned instead of scattered
+SCATTER_MAX_POINTS = 50_000
+
 def setup_visualization_style():
     """Set up the visualization style for consistent, clean plots."""
-    plt.style.use('seaborn')
+    # Matplotlib 3.6 renamed the seaborn style to seaborn-v0_8
+    plt.style.use('seaborn' if 'seaborn' in plt.style.available else 'seaborn-v0_8')
     plt.rcParams['figure.figsize'] = [12, 8]
     plt.rcParams['font.size'] = 12
 
 def load_and_clean_data():
     """Load and clean the FoodPanda restaurant datasets."""
-    # Load the datasets
-    restos = pd.read_csv('restos.csv')
-    restos_2025 = pd.read_csv('restos_2025.csv')
-
-    # Clean restos dataset
-    # Convert Reviewers column from string format (e.g., "(100+)") to numeric
-    restos['Reviewers'] = restos['Reviewers'].str.replace(r'[()+]', '', regex=True)
-    restos['Reviewers'] = pd.to_numeric(restos['Reviewers'], errors='coerce').fillna(0)
-
-    # Drop unnecessary columns from restos
-    restos = restos.drop(columns=['StoreName', 'Location'])
-
-    # Merge datasets
-    restos_df = pd.concat([restos, restos_2025], ignore_index=True)
-
-    # Clean merged dataset
-    restos_df = restos_df.dropna(subset=['FoodType'])
-    restos_df = restos_df.drop_duplicates()
-
-    # Standardize city names
-    restos_df['City'] = restos_df['City'].str.title()
-    
-    return restos_df
+    # Load and merge the datasets without the unnecessary columns. The shared
+    # loader converts Reviewers (e.g. "(100+)") to numbers, drops rows without
+    # a FoodType and duplicates, and standardizes city names.
+    return load_restaurants(['restos.csv', 'restos_2025.csv'],
+                            drop_columns=['StoreName', 'Location'], report=True)
 
 def print_basic_statistics(df):
     """Print basic statistics about the dataset."""
+    stats = aggregates(df)
     print("\n=== Dataset Overview ===")
     print("-" * 25)
     print(f"Total number of restaurants: {len(df)}")
-    print(f"Number of cities: {df['City'].nunique()}")
-    print(f"Number of cuisine types: {df['FoodType'].nunique()}")
+    print(f"Number of cities: {len(stats.city)}")
+    print(f"Number of cuisine types: {len(stats.food_type)}")
     print("\nTop 10 Cities by Number of Restaurants:")
     print("-" * 25)
-    print(df['City'].value_counts().head(10))
+    print(stats.top('City', 'count', 10))
+
+def plot_rating_distribution(df, show=True):
+    """Create visualizations for rating distribution analysis.
 
-def plot_rating_distribution(df):
-    """Create visualizations for rating distribution analysis."""
-    plt.figure(figsize=(15, 10))
+    The figure is shown when `show` is true and returned either way, so the
+    headless report (report.py) can save it instead. Aggregates come from
+    the shared, memoized `aggregates(df)`.
+    """
+    stats = aggregates(df)
+    fig = plt.figure(figsize=(15, 10))
     gs = GridSpec(2, 2)
 
     # Plot 1: Overall Rating Distribution
@@ -72,8 +71,8 @@ def plot_rating_distribution(df):
 
     # Plot 2: Top Cities by Average Rating
     plt.subplot(gs[0, 1])
-    city_ratings = df.groupby('City')['AverageRating'].mean().sort_values(ascending=False)
-    city_ratings.head(10).plot(kind='bar')
+    city_ratings = stats.top('City', 'rating_mean', 10)
+    city_ratings.plot(kind='bar')
     plt.title('Top 10 Cities by Average Rating')
     plt.xticks(rotation=45)
     plt.xlabel('City')
@@ -81,7 +80,7 @@ def plot_rating_distribution(df):
 
     # Plot 3: Top Cuisine Types
     plt.subplot(gs[1, :])
-    cuisine_counts = df['FoodType'].value_counts().head(15)
+    cuisine_counts = stats.top('FoodType', 'count', 15)
     cuisine_counts.plot(kind='bar')
     plt.title('Top 15 Most Common Cuisine Types')
     plt.xticks(rotation=45)
@@ -89,16 +88,25 @@ def plot_rating_distribution(df):
     plt.ylabel('Number of Restaurants')
 
     plt.tight_layout()
-    plt.show()
-
-def plot_review_analysis(df):
-    """Create visualizations for review volume analysis."""
-    plt.figure(figsize=(15, 10))
+    if show:
+        plt.show()
+    return fig
+
+def plot_review_analysis(df, show=True, density='auto', log_reviewers=False):
+    """Create visualizations for review volume analysis.
+
+    `density` selects the reviews-vs-rating panel: 'scatter', 'heatmap'
+    (2D binned counts), 'hexbin', or 'auto' (scatter up to
+    SCATTER_MAX_POINTS rows, heatmap above). `log_reviewers` puts the
+    reviewers axis of the binned views on a log scale.
+    """
+    stats = aggregates(df)
+    fig = plt.figure(figsize=(15, 10))
     gs = GridSpec(2, 2)
 
     # Plot 1: Review Volume Distribution
     plt.subplot(gs[0, 0])
-    sns.histplot(data=df[df['Reviewers'] < df['Reviewers'].quantile(0.95)], 
+    sns.histplot(data=df[df['Reviewers'] < stats.overall['reviewers_q95']], 
                 x='Reviewers', bins=50)
     plt.title('Distribution of Review Volumes\n(excluding outliers)')
     plt.xlabel('Number of Reviews')
@@ -106,35 +114,58 @@ def plot_review_analysis(df):
 
     # Plot 2: Top Cities by Total Reviews
     plt.subplot(gs[0, 1])
-    city_reviews = df.groupby('City')['Reviewers'].sum().sort_values(ascending=False)
-    city_reviews.head(10).plot(kind='bar')
+    city_reviews = stats.top('City', 'reviewers_sum', 10)
+    city_reviews.plot(kind='bar')
     plt.title('Top 10 Cities by Total Reviews')
     plt.xticks(rotation=45)
     plt.xlabel('City')
     plt.ylabel('Total Reviews')
 
-    # Plot 3: Rating vs Reviews Scatter Plot
+    # Plot 3: Rating vs Reviews, as a scatter plot or binned density
     plt.subplot(gs[1, :])
-    plt.scatter(df['Reviewers'], df['AverageRating'], alpha=0.5)
+    if density == 'auto':
+        density = 'scatter' if len(df) <= SCATTER_MAX_POINTS else 'heatmap'
+    xlabel = 'Number of Reviews'
+    if density == 'scatter':
+        plt.scatter(df['Reviewers'], df['AverageRating'], alpha=0.5)
+    elif density == 'hexbin':
+        # hexbin needs positive values on a log axis, so shift by one review
+        x = df['Reviewers'] + 1 if log_reviewers else df['Reviewers']
+        plt.hexbin(x, df['AverageRating'], gridsize=40, bins='log', mincnt=1, cmap='viridis',
+                   xscale='log' if log_reviewers else 'linear')
+        plt.colorbar(label='Number of Restaurants')
+        if log_reviewers:
+            xlabel = 'Number of Reviews + 1 (log scale)'
+    else:
+        grid = review_rating_grid(df['Reviewers'], df['AverageRating'], log_reviewers=log_reviewers)
+        counts = np.ma.masked_equal(grid.counts, 0)
+        plt.pcolormesh(grid.reviewer_edges, grid.rating_edges, counts, norm=LogNorm(), cmap='viridis')
+        plt.colorbar(label='Number of Restaurants')
+        if log_reviewers:
+            plt.xscale('symlog', linthresh=1)
+            xlabel = 'Number of Reviews (log scale)'
     plt.title('Relationship between Number of Reviews and Average Rating')
-    plt.xlabel('Number of Reviews')
+    plt.xlabel(xlabel)
     plt.ylabel('Average Rating')
 
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
+    return fig
 
-def plot_cuisine_analysis(df):
+def plot_cuisine_analysis(df, show=True):
     """Create visualizations for cuisine type analysis."""
     # Get top 10 cuisine types
-    top_cuisines = df['FoodType'].value_counts().head(10).index
+    stats = aggregates(df)
+    top_cuisines = stats.top('FoodType', 'count', 10).index
     cuisine_data = df[df['FoodType'].isin(top_cuisines)]
 
-    plt.figure(figsize=(15, 10))
+    fig = plt.figure(figsize=(15, 10))
     gs = GridSpec(2, 1, height_ratios=[2, 1])
 
     # Plot 1: Box plot of ratings by cuisine type
     plt.subplot(gs[0])
-    sns.boxplot(data=cuisine_data, x='FoodType', y='AverageRating')
+    sns.boxplot(data=cuisine_data, x='FoodType', y='AverageRating', order=top_cuisines)
     plt.title('Rating Distribution by Cuisine Type')
     plt.xticks(rotation=45)
     plt.xlabel('Cuisine Type')
@@ -142,7 +173,7 @@ def plot_cuisine_analysis(df):
 
     # Plot 2: Average reviews by cuisine type
     plt.subplot(gs[1])
-    cuisine_reviews = cuisine_data.groupby('FoodType')['Reviewers'].mean().sort_values(ascending=False)
+    cuisine_reviews = stats.food_type.loc[top_cuisines, 'reviewers_mean'].sort_values(ascending=False, kind='stable')
     cuisine_reviews.plot(kind='bar')
     plt.title('Average Number of Reviews by Cuisine Type')
     plt.xticks(rotation=45)
@@ -150,28 +181,35 @@ def plot_cuisine_analysis(df):
     plt.ylabel('Average Number of Reviews')
 
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
+    return fig
 
 def print_conclusions(df):
     """Generate and print conclusions from the analysis."""
-    top_cities = df.groupby('City').size().sort_values(ascending=False).head(3)
-    top_rated_cities = df.groupby('City')['AverageRating'].mean().sort_values(ascending=False).head(3)
-    top_cuisines = df['FoodType'].value_counts().head(3)
-    top_rated_cuisines = df.groupby('FoodType')['AverageRating'].mean().sort_values(ascending=False).head(3)
+    stats = aggregates(df)
+    top_cities = stats.top('City', 'count', 3)
+    top_cuisines = stats.top('FoodType', 'count', 3)
+    # Ranked by a review-weighted score, so unreviewed or barely reviewed
+    # restaurants cannot carry a city or cuisine to the top
+    leaderboard = Leaderboard(df)
+    top_rated_cities = leaderboard.top('City', 3)['City']
+    top_rated_cuisines = leaderboard.top('FoodType', 3)['FoodType']
 
     print("\n=== Key Insights from the Analysis ===")
     print("-" * 35)
     print("\n1. City Analysis:")
     print(f"   - Top cities by number of restaurants: {', '.join(top_cities.index)}")
-    print(f"   - Highest rated cities: {', '.join(top_rated_cities.index)}")
+    print(f"   - Highest rated cities: {', '.join(top_rated_cities)}")
     
     print("\n2. Cuisine Analysis:")
     print(f"   - Most common cuisine types: {', '.join(top_cuisines.index)}")
-    print(f"   - Highest rated cuisine types: {', '.join(top_rated_cuisines.index)}")
+    print(f"   - Highest rated cuisine types: {', '.join(top_rated_cuisines)}")
+    print(f"     (restaurants with at least {MIN_REVIEWERS} reviewers, weighted by their reviews)")
     
     print("\n3. Rating Patterns:")
-    print(f"   - Average rating across all restaurants: {df['AverageRating'].mean():.2f}")
-    print(f"   - Median number of reviews: {df['Reviewers'].median():.0f}")
+    print(f"   - Average rating across all restaurants: {stats.overall['rating_mean']:.2f}")
+    print(f"   - Median number of reviews: {stats.overall['reviewers_median']:.0f}")
 
 def main():
     """Main function to run the analysis."""
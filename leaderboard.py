@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Top-K leaderboards of restaurants, cities and cuisines.
+
+Ranking by the raw mean AverageRating puts a 5.0 restaurant with two
+reviews (or a city made of such restaurants) above busy places rated 4.7,
+and restaurants without reviews carry a rating of 0. Here, only
+restaurants with at least `min_reviewers` reviewers count, and each is
+scored with a Bayesian average that shrinks its rating towards the
+dataset mean C by a prior weight of m reviews:
+
+    score = (rating * reviewers + C * m) / (reviewers + m)
+
+A city or cuisine is scored the same way from the summed reviews of its
+restaurants, so a group needs many well-rated reviews to reach the top.
+
+The restaurant scores are computed and sorted once per dataset version.
+A query walks that order and keeps the first K rows passing the filters;
+when the filters select only a few rows, those rows are ranked directly
+with a partial selection (np.argpartition) instead. Groups are totalled
+with np.bincount over the filtered rows and the top K picked the same way.
+No query sorts the frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+MIN_REVIEWERS = 10
+SCAN_CHUNK = 1024
+GROUP_KEYS = ('City', 'FoodType')
+
+
+def bayesian_score(ratings, reviewers, prior_mean, prior_weight):
+    """Ratings shrunk towards `prior_mean` by `prior_weight` reviews (vectorized)."""
+    reviewers = np.asarray(reviewers, dtype='float64')
+    return (np.asarray(ratings, dtype='float64') * reviewers + prior_mean * prior_weight) / (reviewers + prior_weight)
+
+
+def _top(scores, k):
+    """Positions of the `k` highest `scores`, best first, without a full sort."""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class Leaderboard:
+    """Confidence-weighted rankings of one dataset version.
+
+    Args:
+        df: Cleaned restaurants (AverageRating, Reviewers, City, FoodType and
+            CompleteStoreName or StoreName).
+        prior_weight: Reviews of the prior (m); defaults to the median number
+            of reviewers of the reviewed restaurants.
+    """
+
+    def __init__(self, df, prior_weight=None):
+        self.df = df
+        self.ratings = df['AverageRating'].to_numpy(dtype='float64', na_value=np.nan)
+        self.reviewers = df['Reviewers'].to_numpy(dtype='float64', na_value=0)
+
+        # Restaurants without reviewers or a rating are never ranked
+        reviewed = (self.reviewers > 0) & ~np.isnan(self.ratings)
+        weights = self.reviewers[reviewed]
+        self.prior_mean = float(np.average(self.ratings[reviewed], weights=weights)) if weights.sum() else 0.0
+        self.prior_weight = float(prior_weight if prior_weight is not None else
+                                  (np.median(weights) if len(weights) else 1.0))
+
+        self.scores = np.full(len(df), -np.inf)
+        self.scores[reviewed] = bayesian_score(self.ratings[reviewed], weights,
+                                               self.prior_mean, self.prior_weight)
+
+        # Reviewed rows by score, best first; ties go to the most reviewed
+        rows = np.flatnonzero(reviewed)
+        self.order = rows[np.lexsort((rows, -self.reviewers[rows], -self.scores[rows]))]
+
+        self.groups = {}
+        for key in GROUP_KEYS:
+            codes, labels = pd.factorize(df[key], sort=True)
+            self.groups[key] = (codes, np.asarray(labels, dtype=object))
+
+    def top_rows(self, k=10, filter_index=None, city=None, food_type=None, rating_range=None,
+                 min_reviewers=MIN_REVIEWERS):
+        """Row positions of the `k` best scored restaurants matching the filters."""
+        filters = (city, food_type, rating_range)
+        selected = filter_index.rows(*filters) if filter_index is not None else None
+
+        # About k * len(order) / len(selected) rows of the order are walked to
+        # find k matches; a selection smaller than that is ranked directly
+        if selected is not None and len(selected) ** 2 <= k * len(self.order):
+            rows = selected[(self.reviewers[selected] >= min_reviewers) & np.isfinite(self.scores[selected])]
+            return rows[_top(self.scores[rows], k)]
+
+        found, count, start, chunk = [], 0, 0, max(SCAN_CHUNK, 4 * k)
+        while start < len(self.order) and count < k:
+            rows = self.order[start:start + chunk]
+            keep = self.reviewers[rows] >= min_reviewers
+            if selected is not None:
+                keep &= filter_index.matches(rows, *filters)
+            found.append(rows[keep])
+            count += int(keep.sum())
+            start += chunk
+            chunk *= 2
+        return np.concatenate(found or [np.empty(0, dtype=np.intp)])[:k]
+
+    def top_restaurants(self, k=10, **filters):
+        """The `k` best scored restaurants as a frame (see `top_rows` for the arguments)."""
+        rows = self.top_rows(k, **filters)
+        df = self.df.iloc[rows]
+        names = df['CompleteStoreName'] if 'CompleteStoreName' in df.columns else df['StoreName']
+        if 'StoreName' in df.columns:
+            names = names.fillna(df['StoreName'])
+        return pd.DataFrame({
+            'Restaurant': names.to_numpy(dtype=object),
+            'City': df['City'].to_numpy(dtype=object),
+            'FoodType': df['FoodType'].to_numpy(dtype=object),
+            'AverageRating': self.ratings[rows],
+            'Reviewers': self.reviewers[rows].astype('int64'),
+            'Score': self.scores[rows],
+        })
+
+    def top_groups(self, key, k=10, filter_index=None, city=None, food_type=None, rating_range=None,
+                   min_reviewers=MIN_REVIEWERS):
+        """The `k` best scored values of `key` ('City' or 'FoodType') as a frame.
+
+        Columns: the key, Score, AverageRating (reviewer-weighted), Reviewers
+        and Restaurants (those with at least `min_reviewers` reviewers).
+        """
+        codes, labels = self.groups[key]
+        rows = filter_index.rows(city, food_type, rating_range) if filter_index is not None else None
+        keep = (self.reviewers >= min_reviewers) & np.isfinite(self.scores)
+        rows = np.flatnonzero(keep) if rows is None else rows[keep[rows]]
+        rows = rows[codes[rows] >= 0]
+
+        group = codes[rows]
+        reviewers = np.bincount(group, weights=self.reviewers[rows], minlength=len(labels))
+        weighted = np.bincount(group, weights=self.ratings[rows] * self.reviewers[rows], minlength=len(labels))
+        restaurants = np.bincount(group, minlength=len(labels))
+
+        present = np.flatnonzero(restaurants)
+        scores = (weighted[present] + self.prior_mean * self.prior_weight) / (reviewers[present] + self.prior_weight)
+        order = _top(scores, k)
+        best = present[order]
+        return pd.DataFrame({
+            key: labels[best],
+            'Score': scores[order],
+            'AverageRating': weighted[best] / reviewers[best],
+            'Reviewers': reviewers[best].astype('int64'),
+            'Restaurants': restaurants[best],
+        })
+
+    def top(self, by='restaurant', k=10, **filters):
+        """Top `k` restaurants (`by='restaurant'`), cities ('City') or cuisines ('FoodType')."""
+        if by == 'restaurant':
+            return self.top_restaurants(k, **filters)
+        return self.top_groups(by, k, **filters)
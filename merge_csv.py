@@ -1,12 +1,113 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 
-# Read both CSV files
-df1 = pd.read_csv('restos (1).csv')
-df2 = pd.read_csv('restos_2025.csv')
+from data_loader import apply_schema, load_restaurants
+from snapshot import write_snapshot
+
+SOURCES = ('restos (1).csv', 'restos_2025.csv')
+OUTPUT = 'FoodpandaCombo.csv'
+
+def merge(sources=SOURCES, output=OUTPUT):
+    # Read, combine and clean both CSV files into the typed schema
+    combined_df = load_restaurants(sources, report=True)
+
+    # Save the combined dataframe to a new CSV file
+    combined_df.to_csv(output, index=False)
+
+    # Also save a typed columnar snapshot so loaders can skip CSV parsing
+    if write_snapshot(combined_df, output, typed=True) is None:
+        print("pyarrow not installed; skipped the columnar snapshot")
+    print("CSV files merged successfully!")
+    return combined_df
+
+class FingerprintSet:
+    """Compact set of 64-bit row fingerprints kept as one sorted uint64 array (8 bytes per row)."""
+
+    def __init__(self):
+        self._sorted = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    @property
+    def nbytes(self):
+        return self._sorted.nbytes
+
+    def add(self, fingerprints):
+        """Add a batch of fingerprints; return a mask of the positions seen for the first time."""
+        unique, first = np.unique(fingerprints, return_index=True)
+        pos = np.searchsorted(self._sorted, unique)
+        known = np.zeros(len(unique), dtype=bool)
+        in_range = pos < len(self._sorted)
+        known[in_range] = self._sorted[pos[in_range]] == unique[in_range]
+
+        mask = np.zeros(len(fingerprints), dtype=bool)
+        mask[first[~known]] = True
+        # Both inputs are sorted, so the stable sort only merges two runs
+        self._sorted = np.sort(np.concatenate([self._sorted, unique[~known]]), kind='stable')
+        return mask
+
+def normalize_chunk(chunk):
+    """Clean one chunk the same way the full merge cleans the combined data."""
+    chunk = chunk.dropna(subset=['FoodType'])
+    chunk = chunk.assign(City=chunk['City'].str.title(), FoodType=chunk['FoodType'].str.strip())
+    return chunk
+
+def _fingerprints(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def stream_merge(sources=SOURCES, output=OUTPUT, chunksize=100_000, key=None):
+    """Merge the sources chunk by chunk with bounded memory.
+
+    Each chunk is cleaned and cast like `merge()` does, so both write the
+    same file, then deduplicated against a FingerprintSet of everything
+    written so far: whole-row hashes by default, or hashes of the `key`
+    column (e.g. 'StoreId') in key mode, in which case the first row seen
+    for each key wins. Rows without a key are deduplicated on the whole row
+    in key mode. Peak memory is one chunk plus 8 bytes per distinct row,
+    independent of the input size.
+    """
+    # The output has the union of all source columns, in first-seen order
+    columns = []
+    for source in sources:
+        columns += [c for c in pd.read_csv(source, nrows=0).columns if c not in columns]
+
+    seen_keys, seen_rows = FingerprintSet(), FingerprintSet()
+    rows_read = rows_written = 0
+    for source in sources:
+        # Reading as text keeps the columns of every chunk parsed the same way;
+        # the hashes depend on the values only, not on the integer widths
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str):
+            rows_read += len(chunk)
+            chunk = apply_schema(normalize_chunk(chunk.reindex(columns=columns)))
+            first = np.empty(len(chunk), dtype=bool)
+            if key:
+                keyed = chunk[key].notna().to_numpy()
+                first[keyed] = seen_keys.add(_fingerprints(chunk.loc[keyed, [key]]))
+            else:
+                keyed = np.zeros(len(chunk), dtype=bool)
+            first[~keyed] = seen_rows.add(_fingerprints(chunk[~keyed]))
+            chunk = chunk[first]
+            chunk.to_csv(output, mode='w' if rows_written == 0 else 'a',
+                         header=rows_written == 0, index=False)
+            rows_written += len(chunk)
+
+    fingerprint_bytes = seen_keys.nbytes + seen_rows.nbytes
+    print(f"Streamed {rows_read} rows into {rows_written} unique rows "
+          f"({fingerprint_bytes / 1024:.0f} KiB of fingerprints)")
+    return rows_written
 
-# Concatenate the dataframes
-combined_df = pd.concat([df1, df2], ignore_index=True)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Merge the restaurant CSV files into FoodpandaCombo.csv')
+    parser.add_argument('--stream', action='store_true',
+                        help='merge in chunks with bounded memory (no columnar snapshot is written)')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='rows per chunk in --stream mode')
+    parser.add_argument('--key', help="deduplicate on this column (e.g. StoreId) instead of whole rows")
+    args = parser.parse_args()
 
-# Save the combined dataframe to a new CSV file
-combined_df.to_csv('FoodpandaCombo.csv', index=False)
-print("CSV files merged successfully!")
+    if args.stream:
+        stream_merge(chunksize=args.chunksize, key=args.key)
+    else:
+        merge()
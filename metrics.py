@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-stage timing for the dashboard callbacks, exported in Prometheus format.
+
+A callback wraps its work in `metrics.trace('update_dashboard')` and each
+stage in `metrics.span('filter', rows=...)`. Span durations and row counts
+go into histograms labelled by callback and span. `instrument(server)` adds
+a `/metrics` route to the Flask server and times the serialization of each
+Dash response: the request time not spent inside the callback itself. If a
+callback takes longer than `slow_threshold` seconds, its span breakdown is
+printed. The active trace is held in context variables, so spans opened in
+worker threads started with `contextvars.copy_context()` are attributed to
+the callback that started them.
+
+Under a multi-process server each worker only sees its own requests. When
+INSIGHTPLATE_METRICS_DIR is set (gunicorn.conf.py sets it), every process
+writes its histograms to its own file in that directory from a background
+thread, every `flush_interval` seconds when something changed, so no
+callback waits for the disk. `/metrics` sums the files of all processes
+with the live histograms of the one that answers. The files of exited
+workers are removed (`remove_process`, called from gunicorn's child_exit
+hook); Prometheus sees the drop as a counter reset. The extra gauges (cache
+counters, start-up times) stay per process and carry the `pid` of the
+worker that answered.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+FLUSH_INTERVAL = 5.0
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set."""
+
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def state(self):
+        """The series as JSON-friendly [label values, counts] pairs."""
+        with self._lock:
+            return [[list(label_values), list(series)] for label_values, series in self._series.items()]
+
+    def reset(self):
+        """Drop all series and recreate the lock, e.g. in a forked child."""
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def render(self, states=()):
+        """Exposition text of this histogram plus the `state()` of other processes."""
+        merged = {}
+        with self._lock:
+            for label_values, series in self._series.items():
+                merged[label_values] = list(series)
+        for state in states:
+            for label_values, series in state:
+                label_values = tuple(label_values)
+                if label_values in merged:
+                    merged[label_values] = [a + b for a, b in zip(merged[label_values], series)]
+                else:
+                    merged[label_values] = list(series)
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(merged.items()):
+            labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Span:
+    """One timed stage of a callback."""
+
+    __slots__ = ('name', 'rows', 'seconds')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+
+
+class Metrics:
+    """Registry of the dashboard's span histograms and the active callback traces."""
+
+    def __init__(self, slow_threshold=None, multiprocess_dir=None, flush_interval=FLUSH_INTERVAL):
+        self.slow_threshold = slow_threshold
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self.span_seconds = Histogram('insightplate_span_seconds', 'Time spent per callback stage.',
+                                      SECONDS_BUCKETS, ('callback', 'span'))
+        self.span_rows = Histogram('insightplate_span_rows', 'Rows processed per callback stage.',
+                                   ROWS_BUCKETS, ('callback', 'span'))
+        self.callback_seconds = Histogram('insightplate_callback_seconds', 'Total time per callback.',
+                                          SECONDS_BUCKETS, ('callback',))
+        self.response_bytes = Histogram('insightplate_response_bytes', 'Size of Dash callback responses.',
+                                        BYTES_BUCKETS, ('callback',))
+        self.extra = []  # callables returning extra exposition text (e.g. cache counters)
+        self._callback = ContextVar('insightplate_callback', default=None)
+        self._spans = ContextVar('insightplate_spans', default=None)
+        self._start_process()
+
+    @property
+    def histograms(self):
+        return (self.callback_seconds, self.span_seconds, self.span_rows, self.response_bytes)
+
+    def _start_process(self):
+        # pids are reused, so the file name also carries a random part; the
+        # file of an exited worker must not be overwritten by a new one
+        self._process_file = f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        self._flush_lock = threading.Lock()
+        self._changed = threading.Event()
+        if self.multiprocess_dir:
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def after_fork(self):
+        """Start a forked child from empty histograms and its own metrics file.
+
+        The observations inherited from the parent are already in the
+        parent's file, a lock held by one of its threads would stay locked
+        forever in the child, and the flush thread is not inherited.
+        """
+        for histogram in self.histograms:
+            histogram.reset()
+        self._start_process()
+
+    def process_labels(self):
+        """Labels for per-process gauges: the pid when several processes are merged."""
+        return {'pid': os.getpid()} if self.multiprocess_dir else {}
+
+    def flush(self):
+        """Write this process's histograms to the multiprocess directory, if any."""
+        if not self.multiprocess_dir:
+            return
+        state = {histogram.name: histogram.state() for histogram in self.histograms}
+        path = os.path.join(self.multiprocess_dir, self._process_file)
+        with self._flush_lock:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+
+    def _flush_loop(self):
+        while True:
+            self._changed.wait()
+            time.sleep(self.flush_interval)
+            self._changed.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Could not write metrics to {self.multiprocess_dir}: {str(e)}")
+
+    def remove_process(self, pid):
+        """Delete the metrics files of an exited process, e.g. from gunicorn's child_exit hook."""
+        if not self.multiprocess_dir:
+            return
+        for path in glob.glob(os.path.join(self.multiprocess_dir, f"{pid}-*.json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _other_processes(self):
+        """Histogram states written by the other processes, by histogram name."""
+        states = {histogram.name: [] for histogram in self.histograms}
+        if not self.multiprocess_dir or not os.path.isdir(self.multiprocess_dir):
+            return states
+        for name in os.listdir(self.multiprocess_dir):
+            if not name.endswith('.json') or name == self._process_file:
+                continue
+            try:
+                with open(os.path.join(self.multiprocess_dir, name)) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for histogram_name, series in state.items():
+                if histogram_name in states:
+                    states[histogram_name].append(series)
+        return states
+
+    @contextmanager
+    def trace(self, callback):
+        """Time a whole callback and collect the spans opened inside it."""
+        spans = []
+        callback_token = self._callback.set(callback)
+        spans_token = self._spans.set(spans)
+        start = time.perf_counter()
+        try:
+            yield spans
+        finally:
+            total = time.perf_counter() - start
+            self._callback.reset(callback_token)
+            self._spans.reset(spans_token)
+            self.callback_seconds.observe(total, callback)
+            _remember_callback(callback, total)
+            if self.slow_threshold is not None and total > self.slow_threshold:
+                self.log_slow(callback, total, spans)
+            self._changed.set()
+
+    @contextmanager
+    def span(self, name, rows=None):
+        """Time one stage of the current callback; set `span.rows` inside if not known up front."""
+        span = Span(name, rows)
+        callback = self._callback.get() or 'none'
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.observe(callback, span, time.perf_counter() - start)
+
+    def observe(self, callback, span, seconds):
+        span.seconds = seconds
+        self.span_seconds.observe(seconds, callback, span.name)
+        if span.rows is not None:
+            self.span_rows.observe(span.rows, callback, span.name)
+        spans = self._spans.get()
+        if spans is not None and self._callback.get() == callback:
+            spans.append(span)
+
+    def log_slow(self, callback, total, spans):
+        breakdown = ', '.join(
+            f"{s.name}={s.seconds * 1000:.1f}ms" + (f" ({s.rows} rows)" if s.rows is not None else '')
+            for s in spans)
+        print(f"Slow callback {callback}: {total * 1000:.1f} ms [{breakdown}]")
+
+    def render(self):
+        others = self._other_processes()
+        parts = [histogram.render(others[histogram.name]) for histogram in self.histograms]
+        parts += [extra() for extra in self.extra]
+        return '\n'.join(parts) + '\n'
+
+    def instrument(self, server, path='/metrics'):
+        """Add the /metrics route to a Flask server and time Dash response serialization."""
+        from flask import Response, g, request
+
+        @server.route(path)
+        def metrics_endpoint():
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+        @server.before_request
+        def start_timer():
+            g.insightplate_request_start = time.perf_counter()
+
+        @server.after_request
+        def record_serialization(response):
+            if request.path.endswith('_dash-update-component') and hasattr(g, 'insightplate_callback'):
+                callback, callback_seconds = g.insightplate_callback
+                total = time.perf_counter() - g.insightplate_request_start
+                span = Span('serialize', rows=None)
+                self.observe(callback, span, max(total - callback_seconds, 0.0))
+                self.response_bytes.observe(response.calculate_content_length() or 0, callback)
+                self._changed.set()
+            return response
+
+
+def _remember_callback(callback, seconds):
+    """Tell the request hooks which callback ran and how long it took, when inside Flask."""
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return
+    if has_request_context():
+        g.insightplate_callback = (callback, seconds)
+
+
+def prometheus_counters(name, help_text, values, labels=None):
+    """Render a dict of counters as Prometheus gauges, e.g. cache hit/miss stats."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    label_text = ','.join(f'{k}="{v}"' for k, v in (labels or {}).items())
+    for key, value in values.items():
+        if isinstance(value, (int, float)):
+            sep = ',' if label_text else ''
+            lines.append(f'{name}{{{label_text}{sep}stat="{key}"}} {value}')
+    return '\n'.join(lines)
+
+
+metrics = Metrics(multiprocess_dir=os.environ.get('INSIGHTPLATE_METRICS_DIR'))
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Trigram index for finding restaurants by name.
+
+Each row's CompleteStoreName (or StoreName when it is missing) is normalized
+with vectorized string operations (lower case, no accents or punctuation),
+as are queries. Distinct names are split into byte trigrams with every
+word padded as "$word$"; the "$" marks the start and end of each word, so
+a query matches words anywhere in a name, not only at its start. Trigrams
+spanning two words are left out. Trigrams are extracted with numpy over
+fixed-width byte arrays and stored as one sorted posting array per trigram
+(CSR layout). There is no per-name Python loop, either when building or
+when searching.
+
+A query is split the same way, but without the closing "$" of its last
+word so that it matches word prefixes. With up to `max_typos` typos a name
+may miss a few of the query's trigrams. Candidates are taken from the
+rarest query trigrams only (a name missing at most m trigrams must contain
+one of the m + 1 rarest) and then checked against the rest with binary
+searches, so the cost follows the rarest postings rather than the number
+of names. Names containing every
+query trigram are looked up first; the typo-tolerant pass only runs when
+they do not fill the requested number of results. Hits are ranked by the
+share of query trigrams they contain, then by trigram similarity, then by
+rating. After an ingest, `updated` indexes only the appended names and
+merges their postings into the existing ones.
+"""
+
+import numpy as np
+import pandas as pd
+
+MAX_NAME_BYTES = 96
+BUILD_BATCH = 500_000
+# A substitution changes up to three trigrams, a transposition up to four
+TRIGRAMS_PER_TYPO = 4
+
+
+def normalize_names(names):
+    """Lower-case names and strip accents and punctuation ("Sulit Shawarma!" -> "sulit shawarma")."""
+    names = pd.Series(names, dtype=str).fillna('')
+    names = names.str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True).str.lower()
+    return names.str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+
+
+def _trigram_matrix(padded):
+    """Trigram ids (24-bit) of byte strings; returns (string ids, trigram ids)."""
+    width = max(3, max((len(s) for s in padded), default=3))
+    array = np.array(padded, dtype=f'S{width}')
+    lengths = np.char.str_len(array)
+    matrix = array.view(np.uint8).reshape(len(array), width).astype(np.uint32)
+    grams = (matrix[:, :-2] << 16) | (matrix[:, 1:-1] << 8) | matrix[:, 2:]
+    valid = np.arange(width - 2) < (lengths - 2)[:, None]
+    # Words are separated by single spaces; trigrams across them are skipped
+    space = matrix == ord(' ')
+    valid &= ~(space[:, :-2] | space[:, 1:-1] | space[:, 2:])
+    ids, _ = np.nonzero(valid)
+    return ids, grams[valid]
+
+
+def _sorted_unique(values):
+    # Sort-based; np.unique is many times slower on large int64 arrays.
+    # Values are non-negative, so prepending -1 keeps the first one
+    values = np.sort(values)
+    return values[np.diff(values, prepend=-1) != 0]
+
+
+def _encode(text, closed=True):
+    """'sulit shawarma' -> b'$sulit$ $shawarma$' (the last '$' only when `closed`)."""
+    data = ('$' + text.replace(' ', '$ $') + ('$' if closed else '')).encode('utf-8')
+    return data[:MAX_NAME_BYTES]
+
+
+class SearchResult:
+    """Matching row positions, best first, with their relevance scores."""
+
+    __slots__ = ('rows', 'scores')
+
+    def __init__(self, rows, scores):
+        self.rows = rows
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class NameIndex:
+    """Trigram inverted index over the restaurant names of one dataset version."""
+
+    def __init__(self, df):
+        names = df['CompleteStoreName'] if 'CompleteStoreName' in df.columns else df['StoreName']
+        if 'StoreName' in df.columns:
+            names = names.fillna(df['StoreName'])
+        # Index distinct names; many rows can share one
+        codes, raw = pd.factorize(names.fillna(''))
+        codes, self.names = pd.factorize(normalize_names(np.asarray(raw, dtype=object)).to_numpy()[codes])
+        self.names = np.asarray(self.names, dtype=object)
+        self.ratings = df['AverageRating'].to_numpy(dtype='float32', na_value=np.nan)
+
+        # Rows of each name id, grouped with one stable sort
+        order = np.argsort(codes, kind='stable')
+        self.name_rows = order.astype(np.int64)
+        self.name_offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.names)))])
+
+        # Trigram postings, built in batches to bound the temporary matrices
+        pairs = []
+        for start in range(0, len(self.names), BUILD_BATCH):
+            batch = [_encode(n) for n in self.names[start:start + BUILD_BATCH]]
+            ids, grams = _trigram_matrix(batch)
+            pairs.append(_sorted_unique((ids + start).astype(np.int64) << 24 | grams.astype(np.int64)))
+        pairs = np.concatenate(pairs) if pairs else np.empty(0, dtype=np.int64)
+        name_ids = (pairs >> 24).astype(np.int32)
+        grams = (pairs & 0xFFFFFF).astype(np.int32)
+        self.gram_counts = np.bincount(name_ids, minlength=len(self.names))
+
+        order = np.argsort(grams, kind='stable')  # name ids stay ascending per trigram
+        self.postings = name_ids[order]
+        grams = grams[order]
+        starts = np.flatnonzero(np.diff(grams, prepend=-1))
+        self.trigrams = grams[starts]
+        self.offsets = np.append(starts, len(grams))
+
+        # Sorted names for queries too short to have a trigram
+        self._sorted = np.argsort(self.names)
+        self._sorted_names = self.names[self._sorted]
+
+    def updated(self, added, removed):
+        """Return the index with the `removed` rows dropped and the `added` rows appended.
+
+        `removed` is indexed by row position (see `ingest.apply_upserts`).
+        Only the names of `added` are normalized and split into trigrams.
+        They get new name ids, after all existing ones, even when an older
+        row has the same name, so every posting list stays sorted with the
+        new ids inserted at its end. Names left without rows match nothing
+        until the next full build.
+        """
+        keep = np.ones(len(self.ratings), dtype=bool)
+        keep[removed.index.to_numpy()] = False
+        new_positions = np.cumsum(keep) - 1
+        delta = NameIndex(added)
+        n_names = len(self.names)
+
+        index = NameIndex.__new__(NameIndex)
+        index.names = np.concatenate([self.names, delta.names])
+        index.ratings = np.concatenate([self.ratings[keep], delta.ratings])
+        index.gram_counts = np.concatenate([self.gram_counts, delta.gram_counts])
+
+        # Rows of the existing names, renumbered; the added rows come last
+        name_ids = np.repeat(np.arange(n_names), np.diff(self.name_offsets))
+        kept = keep[self.name_rows]
+        counts = np.concatenate([np.bincount(name_ids[kept], minlength=n_names), np.diff(delta.name_offsets)])
+        index.name_rows = np.concatenate([new_positions[self.name_rows[kept]], delta.name_rows + keep.sum()])
+        index.name_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        # Insert each new posting at the end of its trigram's list
+        index.trigrams = _sorted_unique(np.concatenate([self.trigrams, delta.trigrams]))
+        gram_counts = np.zeros(len(index.trigrams), dtype=np.int64)
+        gram_counts[np.searchsorted(index.trigrams, self.trigrams)] += np.diff(self.offsets)
+        gram_counts[np.searchsorted(index.trigrams, delta.trigrams)] += np.diff(delta.offsets)
+        index.offsets = np.concatenate([[0], np.cumsum(gram_counts)])
+        ends = self.offsets[np.searchsorted(self.trigrams, delta.trigrams, side='right')]
+        index.postings = np.insert(self.postings, np.repeat(ends, np.diff(delta.offsets)),
+                                   delta.postings + n_names)
+
+        at = np.searchsorted(self._sorted_names, delta._sorted_names)
+        index._sorted = np.insert(self._sorted, at, delta._sorted + n_names)
+        index._sorted_names = np.insert(self._sorted_names, at, delta._sorted_names)
+        return index
+
+    def _posting(self, gram):
+        i = np.searchsorted(self.trigrams, gram)
+        if i == len(self.trigrams) or self.trigrams[i] != gram:
+            return self.postings[:0]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def _prefix_names(self, prefix):
+        lo = np.searchsorted(self._sorted_names, prefix, side='left')
+        hi = np.searchsorted(self._sorted_names, prefix + '\uffff', side='left')
+        return self._sorted[lo:hi]
+
+    def match_names(self, query, max_typos=1):
+        """Return (name ids, scores) of the names matching `query`."""
+        text = normalize_names([query]).iloc[0]
+        if not text:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        _, grams = _trigram_matrix([_encode(text, closed=False)])
+        grams = np.unique(grams)
+        if len(grams) == 0:
+            ids = self._prefix_names(text)
+            return ids, np.ones(len(ids))
+
+        postings = sorted((self._posting(g) for g in grams), key=len)
+        n = len(postings)
+        # Short queries must still match most of their trigrams
+        misses = min(TRIGRAMS_PER_TYPO * max_typos, (n - 1) // 2)
+        need = n - misses
+
+        candidates = _sorted_unique(np.concatenate(postings[:misses + 1]))
+        hits = np.zeros(len(candidates), dtype=np.int64)
+        for posting in postings:
+            if len(posting) == 0:
+                continue
+            pos = np.searchsorted(posting, candidates).clip(max=len(posting) - 1)
+            hits += posting[pos] == candidates
+        keep = hits >= need
+        candidates, hits = candidates[keep], hits[keep]
+
+        coverage = hits / n
+        similarity = hits / (n + self.gram_counts[candidates] - hits)
+        return candidates, coverage + similarity / 10
+
+    def search(self, query, limit=20, filter_index=None, city=None, food_type=None,
+               rating_range=None, max_typos=1):
+        """Find rows by name, ranked by relevance then rating.
+
+        With a `filter_index` (the FilterIndex of the same data) only rows
+        matching the City, FoodType and rating filters are returned.
+        """
+        # Exact trigram matches always rank above typo matches, so the
+        # typo-tolerant pass is only needed when they are too few
+        for typos in sorted({0, max_typos}):
+            result = self._rank(*self.match_names(query, typos), limit, filter_index,
+                                city, food_type, rating_range)
+            if len(result) >= limit:
+                break
+        return result
+
+    def _rank(self, ids, scores, limit, filter_index, city, food_type, rating_range):
+        if len(ids) == 0:
+            return SearchResult(np.empty(0, dtype=np.int64), np.empty(0))
+
+        # Expand names to their rows
+        starts, ends = self.name_offsets[ids], self.name_offsets[ids + 1]
+        counts = ends - starts
+        row_scores = np.repeat(scores, counts)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        rows = self.name_rows[offsets]
+
+        if filter_index is not None:
+            keep = filter_index.matches(rows, city, food_type, rating_range)
+            rows, row_scores = rows[keep], row_scores[keep]
+
+        ratings = np.nan_to_num(self.ratings[rows], nan=-1)
+        order = np.lexsort((rows, -ratings, -row_scores))[:limit]
+        return SearchResult(rows[order], row_scores[order])
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Headless report rendering for insightplate_analysis.
+
+Every figure of the analysis (rating distribution, review analysis, cuisine
+analysis) is rendered with the non-interactive Agg backend and saved as
+PNG and/or SVG. Figures are rendered in parallel across a process pool. The
+figures, the basic statistics and the `print_conclusions` text are written
+to one Markdown and one HTML report. With `--cities`, a report is produced
+for the whole dataset and for every city in the same run, plus an index
+page that links them.
+
+Usage:
+    python report.py                          # reports/all/report.{md,html}
+    python report.py --cities --formats png,svg --workers 8
+"""
+
+import os
+
+# Headless: must be set before pyplot is imported, here and in the workers
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import argparse
+import html
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import insightplate_analysis as analysis
+from geo import normalize_city
+
+PLOTS = {
+    'rating_distribution': ('Rating Distribution', analysis.plot_rating_distribution),
+    'review_analysis': ('Review Analysis', analysis.plot_review_analysis),
+    'cuisine_analysis': ('Cuisine Analysis', analysis.plot_cuisine_analysis),
+}
+OUTPUT_DIR = 'reports'
+ALL = 'all'
+
+_worker_df = None
+
+
+def scope_slug(city):
+    """Directory name of a report: 'all' or e.g. 'las-pinas-city'."""
+    return ALL if city is None else normalize_city(city).replace(' ', '-')
+
+
+def city_subset(df, city):
+    """Rows of one city (or all rows), with unused categories dropped."""
+    if city is None:
+        return df
+    subset = df[df['City'] == city]
+    categoricals = subset.select_dtypes('category').columns
+    return subset.assign(**{c: subset[c].cat.remove_unused_categories() for c in categoricals})
+
+
+def capture(func, df):
+    """Return what `func(df)` prints."""
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        func(df)
+    return buffer.getvalue().strip('\n')
+
+
+def _init_worker(df):
+    global _worker_df
+    _worker_df = df
+    analysis.setup_visualization_style()
+
+
+def render_figure(city, plot, output_dir, formats):
+    """Render one figure for one scope and save it in each format; runs in a worker."""
+    figure_dir = os.path.join(output_dir, scope_slug(city), 'figures')
+    os.makedirs(figure_dir, exist_ok=True)
+    fig = PLOTS[plot][1](city_subset(_worker_df, city), show=False)
+    paths = {}
+    try:
+        for fmt in formats:
+            path = os.path.join(figure_dir, f'{plot}.{fmt}')
+            fig.savefig(path, format=fmt, dpi=100)
+            paths[fmt] = os.path.relpath(path, os.path.join(output_dir, scope_slug(city)))
+    finally:
+        plt.close(fig)
+    return paths
+
+
+def write_report(output_dir, city, sections, figures, errors):
+    """Write report.md and report.html for one scope; return the HTML path."""
+    scope_dir = os.path.join(output_dir, scope_slug(city))
+    os.makedirs(scope_dir, exist_ok=True)
+    title = 'FoodPanda InsightPlate Report' + (f' — {city}' if city else '')
+
+    md = [f'# {title}', '']
+    body = [f'<h1>{html.escape(title)}</h1>']
+    for heading, text in sections[:1]:
+        md += [f'## {heading}', '', '```text', text, '```', '']
+        body += [f'<h2>{html.escape(heading)}</h2>', f'<pre>{html.escape(text)}</pre>']
+    for plot, (heading, _) in PLOTS.items():
+        md += [f'## {heading}', '']
+        body.append(f'<h2>{html.escape(heading)}</h2>')
+        if plot in errors:
+            md += [f'_Could not render: {errors[plot]}_', '']
+            body.append(f'<p><em>Could not render: {html.escape(errors[plot])}</em></p>')
+            continue
+        paths = figures.get(plot, {})
+        # Only PNG and SVG can be shown inline; other formats are linked
+        image = paths.get('png') or paths.get('svg')
+        if image:
+            md += [f'![{heading}]({image})', '']
+            body.append(f'<img src="{html.escape(image)}" alt="{html.escape(heading)}">')
+        others = [(fmt, path) for fmt, path in paths.items() if path != image]
+        if others:
+            md += [('Also as ' if image else 'As ') + ', '.join(f'[{fmt.upper()}]({path})' for fmt, path in others), '']
+            body.append('<p>' + ', '.join(f'<a href="{html.escape(path)}">{fmt.upper()}</a>'
+                                          for fmt, path in others) + '</p>')
+    for heading, text in sections[1:]:
+        md += [f'## {heading}', '', '```text', text, '```', '']
+        body += [f'<h2>{html.escape(heading)}</h2>', f'<pre>{html.escape(text)}</pre>']
+
+    with open(os.path.join(scope_dir, 'report.md'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(md))
+    html_path = os.path.join(scope_dir, 'report.html')
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(HTML_PAGE.format(title=html.escape(title), body='\n'.join(body)))
+    return html_path
+
+
+def write_index(output_dir, cities):
+    """Link the overall report and every city report from one page."""
+    links = [f'<li><a href="{ALL}/report.html">All cities</a></li>']
+    links += [f'<li><a href="{scope_slug(c)}/report.html">{html.escape(c)}</a></li>' for c in cities]
+    path = os.path.join(output_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HTML_PAGE.format(title='FoodPanda InsightPlate Reports',
+                                 body='<h1>FoodPanda InsightPlate Reports</h1>\n<ul>\n'
+                                      + '\n'.join(links) + '\n</ul>'))
+    return path
+
+
+def build_reports(df, output_dir=OUTPUT_DIR, formats=('png',), per_city=False, workers=None):
+    """Render all figures in parallel and write the reports; return the HTML paths."""
+    cities = sorted(df['City'].dropna().unique()) if per_city else []
+    scopes = [None] + cities
+    figures = {scope: {} for scope in scopes}
+    errors = {scope: {} for scope in scopes}
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker, initargs=(df,)) as pool:
+        futures = {pool.submit(render_figure, scope, plot, output_dir, formats): (scope, plot)
+                   for scope in scopes for plot in PLOTS}
+        for future in as_completed(futures):
+            scope, plot = futures[future]
+            try:
+                figures[scope][plot] = future.result()
+            except Exception as e:
+                # A small city can be too sparse for a panel; keep the rest of its report
+                errors[scope][plot] = str(e) or type(e).__name__
+
+    reports = []
+    for scope in scopes:
+        subset = city_subset(df, scope)
+        sections = [('Dataset Overview', capture(analysis.print_basic_statistics, subset)),
+                    ('Key Insights', capture(analysis.print_conclusions, subset))]
+        reports.append(write_report(output_dir, scope, sections, figures[scope], errors[scope]))
+    if per_city:
+        write_index(output_dir, cities)
+    return reports
+
+
+HTML_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 1100px; margin: 2rem auto; color: #2c3e50; }}
+img {{ max-width: 100%; }}
+pre {{ background: #f5f6fa; padding: 1rem; border-radius: 8px; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def image_formats(value):
+    """Parse --formats; at least one of png and svg is needed to show the figures in the report."""
+    formats = tuple(fmt.strip().lower() for fmt in value.split(',') if fmt.strip())
+    if not {'png', 'svg'} & set(formats):
+        raise argparse.ArgumentTypeError(f"{value!r} has neither png nor svg")
+    return formats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render the InsightPlate analysis to static reports')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='directory for the reports')
+    parser.add_argument('--formats', default=('png',), type=image_formats,
+                        help='comma-separated image formats, including png or svg (e.g. png,svg,pdf)')
+    parser.add_argument('--cities', action='store_true', help='also write a report for every city')
+    parser.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = analysis.load_and_clean_data()
+    reports = build_reports(df, args.output, args.formats,
+                            per_city=args.cities, workers=args.workers)
+    print(f"Wrote {len(reports)} report(s) to {args.output}/ in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Streaming statistics over restaurant CSVs that do not fit in memory.
+
+The figures of `print_basic_statistics`, `print_conclusions` and the review
+analysis (restaurant count, distinct cities and cuisines, top cities and
+cuisines, mean rating, median and 95th percentile of Reviewers) are computed
+over CSV chunks with mergeable sketches:
+
+- `KLLSketch` for quantiles, with rank error about `epsilon`
+- `HyperLogLog` for distinct counts, with relative error about 1.04 / sqrt(2 ** precision)
+- `SpaceSaving` for the most frequent values, with count error at most rows / capacity
+
+Every sketch has a `merge`, so each file (or each worker) is summarized on
+its own and the partial results are combined. Chunks are cleaned like the
+merge step, but rows are not deduplicated across chunks; run
+`merge_csv.py --stream` first when the sources overlap.
+
+Usage:
+    python sketches.py history/*.csv --epsilon 0.005 --workers 8
+"""
+
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from data_loader import parse_reviewers
+from merge_csv import normalize_chunk
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang and Liberty).
+
+    Values are kept in compactors; level h holds items of weight 2 ** h.
+    When a level exceeds its capacity it is sorted and every other item,
+    from a random offset, moves up one level. Memory is O(k) and the rank
+    error of a quantile is about 3.3 / k with high probability.
+    """
+
+    MIN_WIDTH = 8
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def for_error(cls, epsilon, seed=None):
+        """Sketch sized for a rank error of about `epsilon` (0.01 = 1%)."""
+        return cls(k=max(cls.MIN_WIDTH, math.ceil(3.3 / epsilon)), seed=seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(self.MIN_WIDTH, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        while True:
+            over = [h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)]
+            if not over:
+                return
+            h = over[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[h])
+            # With an odd count one item stays behind at this level
+            kept, items = items[:len(items) % 2], items[len(items) % 2:]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[h] = kept
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def merge(self, other):
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate `q` quantile (0 <= q <= 1); NaN if empty."""
+        if not self.n:
+            return float('nan')
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h, dtype='float64')
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[order][min(position, len(items) - 1)])
+
+
+def _hash(values):
+    """Stable 64-bit hashes of the string form of `values`."""
+    return pd.util.hash_pandas_object(pd.Series(values, dtype=str), index=False).to_numpy()
+
+
+def _bit_length(x):
+    """Vectorized int.bit_length for uint64 arrays."""
+    x = x.copy()
+    length = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << shift)
+        length[big] += shift
+        x[big] >>= np.uint64(shift)
+    return length + (x > 0)
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch with 2 ** precision registers."""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, epsilon):
+        """Sketch sized for a relative error of about `epsilon`."""
+        return cls(precision=min(18, max(4, math.ceil(2 * math.log2(1.04 / epsilon)))))
+
+    def update(self, values):
+        hashes = _hash(pd.Series(values).dropna())
+        if not len(hashes):
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        rest = hashes << p
+        # Position of the first 1 bit in the remaining 64 - p bits
+        rank = np.where(rest == 0, 64 - self.precision + 1, 65 - _bit_length(rest))
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class SpaceSaving:
+    """Top-k frequent values with at most `capacity` counters (Metwally et al.).
+
+    Each counter over-estimates its value's count by at most its `error`,
+    and any value with more than rows / capacity occurrences is kept.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def update(self, values):
+        for value, count in pd.Series(values).dropna().value_counts().items():
+            self.add(value, int(count))
+
+    def add(self, value, count=1):
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+            self.errors[value] = 0
+        else:
+            # Replace the smallest counter; its count bounds the new value's error
+            smallest = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(smallest)
+            del self.errors[smallest]
+            self.counts[value] = floor + count
+            self.errors[value] = floor
+
+    def _floor(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def merge(self, other):
+        """Combine two summaries (Agarwal et al.); the result keeps the same guarantee."""
+        floors = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for value in set(self.counts) | set(other.counts):
+            counts[value] = self.counts.get(value, floors[0]) + other.counts.get(value, floors[1])
+            errors[value] = (self.errors.get(value, floors[0]) + other.errors.get(value, floors[1]))
+        keep = sorted(counts, key=lambda v: (-counts[v], str(v)))[:self.capacity]
+        self.counts = {v: counts[v] for v in keep}
+        self.errors = {v: errors[v] for v in keep}
+        return self
+
+    def top(self, n):
+        """The `n` most frequent values as a Series of estimated counts."""
+        ranked = sorted(self.counts, key=lambda v: (-self.counts[v], str(v)))[:n]
+        return pd.Series([self.counts[v] for v in ranked], index=pd.Index(ranked), name='count', dtype='int64')
+
+
+class StreamingStats:
+    """The analysis script's dataset figures, accumulated chunk by chunk.
+
+    Args:
+        epsilon: Rank error of the Reviewers/AverageRating quantiles.
+        distinct_error: Relative error of the distinct City/FoodType counts.
+        top_k: Counters kept per column for the top-k values.
+        seed: Seed for the quantile sketches' random compaction.
+    """
+
+    def __init__(self, epsilon=0.01, distinct_error=0.02, top_k=64, seed=None):
+        self.rows = 0
+        self.rating_sum = 0.0
+        self.rating_count = 0
+        self.ratings = KLLSketch.for_error(epsilon, seed=seed)
+        self.reviewers = KLLSketch.for_error(epsilon, seed=None if seed is None else seed + 1)
+        self.distinct = {c: HyperLogLog.for_error(distinct_error) for c in ('City', 'FoodType')}
+        self.top = {c: SpaceSaving(top_k) for c in ('City', 'FoodType')}
+
+    def update(self, chunk):
+        chunk = normalize_chunk(chunk)
+        ratings = pd.to_numeric(chunk['AverageRating'], errors='coerce')
+        self.rows += len(chunk)
+        self.rating_sum += float(ratings.sum())
+        self.rating_count += int(ratings.count())
+        self.ratings.update(ratings.to_numpy(dtype='float64', na_value=np.nan))
+        self.reviewers.update(parse_reviewers(chunk['Reviewers']).to_numpy())
+        for column in ('City', 'FoodType'):
+            self.distinct[column].update(chunk[column])
+            self.top[column].update(chunk[column])
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.rating_sum += other.rating_sum
+        self.rating_count += other.rating_count
+        self.ratings.merge(other.ratings)
+        self.reviewers.merge(other.reviewers)
+        for column in ('City', 'FoodType'):
+            self.distinct[column].merge(other.distinct[column])
+            self.top[column].merge(other.top[column])
+        return self
+
+    def summary(self):
+        return {
+            'restaurants': self.rows,
+            'cities': self.distinct['City'].count(),
+            'cuisine_types': self.distinct['FoodType'].count(),
+            'top_cities': self.top['City'].top(10),
+            'top_cuisines': self.top['FoodType'].top(3),
+            'mean_rating': self.rating_sum / self.rating_count if self.rating_count else float('nan'),
+            'median_reviewers': self.reviewers.quantile(0.5),
+            'reviewers_q95': self.reviewers.quantile(0.95),
+            'median_rating': self.ratings.quantile(0.5),
+        }
+
+
+def file_stats(path, chunksize=100_000, **options):
+    """Summarize one CSV file chunk by chunk."""
+    stats = StreamingStats(**options)
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str):
+        stats.update(chunk)
+    return stats
+
+
+def stream_statistics(paths, chunksize=100_000, workers=None, seed=0, **options):
+    """Summarize many CSV files in parallel and merge the partial sketches."""
+    jobs = [dict(options, seed=seed + 2 * i) for i in range(len(paths))]
+    if workers == 1 or len(paths) == 1:
+        partials = [file_stats(path, chunksize, **job) for path, job in zip(paths, jobs)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(file_stats, path, chunksize, **job) for path, job in zip(paths, jobs)]
+            partials = [future.result() for future in futures]
+    return reduce(StreamingStats.merge, partials)
+
+
+def print_summary(summary):
+    """Print the streamed figures in the layout of the analysis script."""
+    print("\n=== Dataset Overview (streamed) ===")
+    print("-" * 25)
+    print(f"Total number of restaurants: {summary['restaurants']}")
+    print(f"Number of cities: ~{summary['cities']}")
+    print(f"Number of cuisine types: ~{summary['cuisine_types']}")
+    print("\nTop 10 Cities by Number of Restaurants:")
+    print("-" * 25)
+    print(summary['top_cities'])
+    print(f"\nMost common cuisine types: {', '.join(map(str, summary['top_cuisines'].index))}")
+    print(f"Average rating across all restaurants: {summary['mean_rating']:.2f}")
+    print(f"Median number of reviews: ~{summary['median_reviewers']:.0f}")
+    print(f"95th percentile of reviews: ~{summary['reviewers_q95']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Approximate dataset statistics over CSV chunks')
+    parser.add_argument('paths', nargs='+', help='restaurant CSV files')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--epsilon', type=float, default=0.01, help='quantile rank error (0.01 = 1%%)')
+    parser.add_argument('--distinct-error', type=float, default=0.02, help='relative error of distinct counts')
+    parser.add_argument('--top-k', type=int, default=64, help='counters kept for the top-k values')
+    parser.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    args = parser.parse_args()
+
+    stats = stream_statistics(args.paths, args.chunksize, args.workers, epsilon=args.epsilon,
+                              distinct_error=args.distinct_error, top_k=args.top_k)
+    print_summary(stats.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Columnar snapshots of the restaurant CSV files.
+
+Next to every CSV we can keep an Arrow IPC file (`FoodpandaCombo.csv` ->
+`FoodpandaCombo.arrow`) holding the same rows with their parsed types. The
+snapshot's schema metadata records a format version and the mtime/size of the
+CSV it was written from. Loaders memory-map the snapshot when it is present
+and still matches its CSV, so cold loads skip text parsing and several
+processes share the same pages. pyarrow is optional: without it, or without a
+fresh snapshot, everything falls back to `pd.read_csv`.
+
+Snapshots written from a frame that is already cleaned and typed (as
+`data_loader.load_restaurants` returns it) are marked `typed` and are used
+as they are, without cleaning and casting them again. Their columns stay
+backed by the mapped file where the dtype allows: the Arrow strings as
+they are, and numbers without nulls (missing floats are stored as NaN).
+
+Usage:
+    python snapshot.py restos.csv restos_2025.csv
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import file_version
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+SNAPSHOT_FORMAT = 'insightplate-snapshot'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXT = '.arrow'
+
+
+def snapshot_path(csv_path):
+    """Return the snapshot file that belongs to `csv_path`."""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_EXT
+
+
+def _normalize_object_columns(df):
+    """Make mixed-type object columns (e.g. Reviewers "(100+)" next to 12) storable as strings."""
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col]
+            df[col] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+def _nan_floats(table, df):
+    """Store missing floats as NaN instead of nulls, so they load without a copy."""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type) and table.column(i).null_count:
+            values = np.asarray(df[field.name], dtype=field.type.to_pandas_dtype())
+            table = table.set_column(i, field, pa.array(values, type=field.type, from_pandas=False))
+    return table
+
+
+def write_snapshot(df, csv_path, typed=False):
+    """Write `df` as the columnar snapshot of `csv_path`.
+
+    Call this after the CSV itself was written: the snapshot is stamped with
+    the CSV's current version so later edits to the CSV invalidate it. Pass
+    `typed=True` when `df` is already cleaned and cast to the loader schema.
+    Returns the snapshot path, or None when pyarrow is not installed.
+    """
+    if pa is None:
+        return None
+
+    path = snapshot_path(csv_path)
+    table = pa.Table.from_pandas(_normalize_object_columns(df.copy(deep=False)), preserve_index=False)
+    if typed:
+        table = _nan_floats(table, df)
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'source': os.path.basename(csv_path),
+        'source_version': file_version(csv_path) if os.path.exists(csv_path) else None,
+        'typed': bool(typed),
+        'rows': table.num_rows,
+        'columns': {field.name: str(field.type) for field in table.schema},
+    }
+    metadata = dict(table.schema.metadata or {})
+    metadata[SNAPSHOT_FORMAT.encode()] = json.dumps(header).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write next to the target and rename, so readers never map a partial file
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_header(path):
+    """Return the header dict stored in a snapshot file, or None if it is not one of ours."""
+    if pa is None or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, 'r') as source:
+            schema = ipc.open_file(source).schema
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = (schema.metadata or {}).get(SNAPSHOT_FORMAT.encode())
+    if raw is None:
+        return None
+    header = json.loads(raw)
+    if header.get('format') != SNAPSHOT_FORMAT or header.get('version') != SNAPSHOT_VERSION:
+        return None
+    return header
+
+
+def read_snapshot(csv_path, typed_only=False):
+    """Memory-map the snapshot of `csv_path` if it is present and fresh, else return None.
+
+    With `typed_only`, untyped snapshots are skipped too.
+    """
+    path = snapshot_path(csv_path)
+    header = read_header(path)
+    if header is None or (typed_only and not header.get('typed')):
+        return None
+    if os.path.exists(csv_path) and header['source_version'] != file_version(csv_path):
+        # The CSV was edited after the snapshot was taken
+        return None
+
+    # The map stays open for as long as the frame's buffers reference it
+    table = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def read_table(csv_path, **read_csv_kwargs):
+    """Load `csv_path`, preferring its columnar snapshot over parsing the CSV.
+
+    `read_csv_kwargs` only apply to the CSV fallback.
+    """
+    df = read_snapshot(csv_path)
+    if df is None:
+        df = pd.read_csv(csv_path, **read_csv_kwargs)
+    return df
+
+
+if __name__ == '__main__':
+    if pa is None:
+        print("pyarrow is not installed; run: pip install pyarrow")
+        sys.exit(1)
+    for csv_file in sys.argv[1:]:
+        print(f"Snapshot written: {write_snapshot(pd.read_csv(csv_file), csv_file)}")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Store-level differences between two scrape snapshots.
+
+The merge step concatenates the snapshots and drops duplicates, which hides
+how the market moved between scrapes. This module joins an older and a
+newer snapshot on StoreId and classifies every store as opened (only in
+the new snapshot), closed (only in the old one) or kept, with its rating
+and reviewer changes. Cities are cleaned like the merge step, so "manila"
+and "Manila" are the same city. Unlike the merge step, stores without a
+FoodType (or City) are kept and counted as "Unknown", so they are still
+matched across the snapshots.
+
+StoreIds are factorized into integer codes over both snapshots. Each side
+then maps code -> row position in an array, so the join is a direct-address
+lookup instead of a merge on strings. A rating of 0 with 0 reviewers means
+"not rated yet" and is not compared.
+
+`summarize` totals the changes per City or FoodType: stores before and
+after, opened, closed, churn, and the mean rating change of the rated
+stores found in both snapshots. The totals are plain sums, so the partial
+tables of separate partitions simply add up.
+
+For snapshot pairs larger than memory, `diff_files` first splits both CSVs
+into `partitions` files by a hash of StoreId, reading them in chunks. Every
+store lands in the same partition on both sides, so the partitions are
+diffed one at a time and only one pair is in memory at once.
+
+Usage:
+    python snapshot_diff.py "restos (1).csv" restos_2025.csv --output changes
+    python snapshot_diff.py old.csv new.csv --partitions 64 --chunksize 500000
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_loader import parse_reviewers
+
+SOURCES = ('restos (1).csv', 'restos_2025.csv')
+COLUMNS = ['StoreId', 'CompleteStoreName', 'FoodType', 'AverageRating', 'Reviewers', 'City']
+GROUP_KEYS = ('City', 'FoodType')
+STATUSES = ('opened', 'closed', 'kept')
+UNKNOWN = 'Unknown'  # City or FoodType of stores that have none
+
+# Additive per-group counters; the derived columns are computed from them
+COUNTERS = ['Before', 'After', 'Opened', 'Closed', 'Rated', 'RatingUp', 'RatingDown',
+            'RatingDeltaSum', 'ReviewersDelta']
+
+
+def prepare(df):
+    """One cleaned row per StoreId (the last one), with numeric Rating and Reviewers."""
+    df = df.reindex(columns=COLUMNS).dropna(subset=['StoreId'])
+    df = df.drop_duplicates(subset='StoreId', keep='last')
+    # Clean like merge_csv.normalize_chunk, but without dropping any store
+    df = df.assign(City=df['City'].str.title().fillna(UNKNOWN),
+                   FoodType=df['FoodType'].str.strip().fillna(UNKNOWN))
+    ratings = pd.to_numeric(df['AverageRating'], errors='coerce').astype('float64')
+    reviewers = parse_reviewers(df['Reviewers']).astype('int64')
+    # A rating of 0 without reviewers is a store that has not been rated yet
+    ratings = ratings.where(~((ratings == 0) & (reviewers == 0)))
+    return pd.DataFrame({
+        'StoreId': df['StoreId'].astype(str).to_numpy(dtype=object),
+        'Name': df['CompleteStoreName'].to_numpy(dtype=object),
+        'City': df['City'].to_numpy(dtype=object),
+        'FoodType': df['FoodType'].to_numpy(dtype=object),
+        'Rating': ratings.to_numpy(),
+        'Reviewers': reviewers.to_numpy(),
+    })
+
+
+def diff_snapshots(old, new):
+    """Join two raw snapshot frames on StoreId; one row per store of either side.
+
+    Columns: StoreId, Status (opened / closed / kept), Name, City and
+    FoodType (from the newer snapshot when the store is in it),
+    RatingBefore/After/Delta and ReviewersBefore/After/Delta.
+    """
+    old, new = prepare(old), prepare(new)
+    codes, keys = pd.factorize(np.concatenate([old['StoreId'].to_numpy(), new['StoreId'].to_numpy()]))
+
+    # Row position of every key on each side, -1 when the side lacks it
+    positions = []
+    for side, side_codes in ((old, codes[:len(old)]), (new, codes[len(old):])):
+        pos = np.full(len(keys), -1, dtype=np.int64)
+        pos[side_codes] = np.arange(len(side))
+        positions.append(pos)
+    old_pos, new_pos = positions
+    in_old, in_new = old_pos >= 0, new_pos >= 0
+
+    def column(side, pos, name, fill):
+        values = side[name].to_numpy()[pos.clip(min=0)] if len(side) else np.full(len(pos), fill)
+        return np.where(pos >= 0, values, fill)
+
+    rating_before = column(old, old_pos, 'Rating', np.nan).astype('float64')
+    rating_after = column(new, new_pos, 'Rating', np.nan).astype('float64')
+    reviewers_before = column(old, old_pos, 'Reviewers', 0).astype('int64')
+    reviewers_after = column(new, new_pos, 'Reviewers', 0).astype('int64')
+    kept = in_old & in_new
+
+    status = np.where(kept, 2, np.where(in_new, 0, 1))
+    return pd.DataFrame({
+        'StoreId': np.asarray(keys, dtype=object),
+        'Status': pd.Categorical.from_codes(status, STATUSES),
+        **{name: np.where(in_new, column(new, new_pos, name, None), column(old, old_pos, name, None))
+           for name in ('Name', 'City', 'FoodType')},
+        'RatingBefore': rating_before,
+        'RatingAfter': rating_after,
+        'RatingDelta': rating_after - rating_before,
+        'ReviewersBefore': reviewers_before,
+        'ReviewersAfter': reviewers_after,
+        'ReviewersDelta': np.where(kept, reviewers_after - reviewers_before, 0),
+    })
+
+
+def count_changes(changes, by):
+    """Additive COUNTERS per value of `by` ('City' or 'FoodType')."""
+    status = changes['Status']
+    delta = changes['RatingDelta']
+    frame = pd.DataFrame({
+        by: changes[by],
+        'Before': status != 'opened',
+        'After': status != 'closed',
+        'Opened': status == 'opened',
+        'Closed': status == 'closed',
+        'Rated': delta.notna(),
+        'RatingUp': delta > 0,
+        'RatingDown': delta < 0,
+        'RatingDeltaSum': delta.fillna(0),
+        'ReviewersDelta': changes['ReviewersDelta'],
+    })
+    return frame.groupby(by, sort=True).sum()
+
+
+def finish(counters):
+    """Add the derived columns to summed counters, most churned groups first."""
+    table = counters.copy()
+    table['Net'] = table['After'] - table['Before']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table['Churn'] = (table['Opened'] + table['Closed']) / table['Before'].where(table['Before'] > 0)
+        table['MeanRatingDelta'] = table['RatingDeltaSum'] / table['Rated'].where(table['Rated'] > 0)
+    order = np.lexsort((table.index.to_numpy(dtype=str), -(table['Opened'] + table['Closed']).to_numpy()))
+    return table.iloc[order]
+
+
+def summarize(changes, by):
+    """Churn and rating changes per value of `by` ('City' or 'FoodType')."""
+    return finish(count_changes(changes, by))
+
+
+def _partition(path, directory, side, partitions, chunksize):
+    """Split a CSV into `partitions` files by a hash of StoreId."""
+    paths = [os.path.join(directory, f"{side}-{p}.csv") for p in range(partitions)]
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str):
+        chunk = chunk.reindex(columns=COLUMNS)
+        # hash_array uses a fixed key, so a StoreId maps to the same partition in every chunk
+        part = pd.util.hash_array(chunk['StoreId'].fillna('').to_numpy(dtype=object)) % partitions
+        for p, rows in chunk.groupby(part):
+            rows.to_csv(paths[p], mode='a', header=not os.path.exists(paths[p]), index=False)
+    return paths
+
+
+def _read_part(path):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMNS, dtype=str)
+    return pd.read_csv(path, dtype=str)
+
+
+def diff_files(old_path, new_path, output=None, partitions=1, chunksize=100_000, workdir=None):
+    """Diff two snapshot CSVs; return the summaries per City and FoodType.
+
+    With `partitions` > 1 both files are hash-partitioned on StoreId (under
+    `workdir`, a temporary directory by default) and diffed one partition
+    at a time. When `output` is given, the store-level changes are written
+    to `output`/changes.csv and the summaries to by_city.csv and
+    by_food_type.csv.
+    """
+    if output:
+        os.makedirs(output, exist_ok=True)
+        changes_path = os.path.join(output, 'changes.csv')
+        if os.path.exists(changes_path):
+            os.remove(changes_path)
+
+    counters = {by: [] for by in GROUP_KEYS}
+
+    def add(changes):
+        for by in GROUP_KEYS:
+            counters[by].append(count_changes(changes, by))
+        if output:
+            changes.to_csv(changes_path, mode='a', header=not os.path.exists(changes_path), index=False)
+
+    if partitions <= 1:
+        add(diff_snapshots(pd.read_csv(old_path, dtype=str), pd.read_csv(new_path, dtype=str)))
+    else:
+        with tempfile.TemporaryDirectory(dir=workdir) as directory:
+            old_parts = _partition(old_path, directory, 'old', partitions, chunksize)
+            new_parts = _partition(new_path, directory, 'new', partitions, chunksize)
+            for old_part, new_part in zip(old_parts, new_parts):
+                add(diff_snapshots(_read_part(old_part), _read_part(new_part)))
+
+    summaries = {}
+    for by in GROUP_KEYS:
+        summaries[by] = finish(pd.concat(counters[by]).groupby(level=0).sum())
+        if output:
+            name = 'by_city.csv' if by == 'City' else 'by_food_type.csv'
+            summaries[by].to_csv(os.path.join(output, name))
+    return summaries
+
+
+def print_summary(summaries, top=10):
+    """Print the overall churn and the most churned cities and cuisines."""
+    totals = summaries['City'][COUNTERS].sum().astype('float64')
+    counts = totals.drop('RatingDeltaSum').astype('int64')
+    print("\n=== Changes Between Snapshots ===")
+    print("-" * 25)
+    print(f"Stores before: {counts['Before']}, after: {counts['After']}")
+    print(f"Opened: {counts['Opened']}, closed: {counts['Closed']}, "
+          f"kept: {counts['Before'] - counts['Closed']}")
+    if counts['Rated']:
+        print(f"Mean rating change of rated stores in both: {totals['RatingDeltaSum'] / counts['Rated']:+.3f} "
+              f"({counts['RatingUp']} up, {counts['RatingDown']} down)")
+    columns = ['Before', 'After', 'Opened', 'Closed', 'Churn', 'MeanRatingDelta']
+    for by, title in (('City', 'Cities'), ('FoodType', 'Cuisine Types')):
+        print(f"\nMost Churned {title}:")
+        print("-" * 25)
+        print(summaries[by][columns].head(top).round(3).to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two restaurant snapshots by StoreId')
+    parser.add_argument('old', nargs='?', default=SOURCES[0], help='older snapshot CSV')
+    parser.add_argument('new', nargs='?', default=SOURCES[1], help='newer snapshot CSV')
+    parser.add_argument('--output', help='directory for changes.csv, by_city.csv and by_food_type.csv')
+    parser.add_argument('--partitions', type=int, default=1,
+                        help='hash partitions of StoreId, for inputs larger than memory')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='rows per chunk when partitioning')
+    parser.add_argument('--workdir', help='directory for the partition files (default: a temporary one)')
+    args = parser.parse_args()
+
+    summaries = diff_files(args.old, args.new, args.output, args.partitions, args.chunksize, args.workdir)
+    print_summary(summaries)
+
+
+if __name__ == '__main__':
+    main()
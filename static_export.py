@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Static export of the dashboard for every filter selection.
+
+For public, read-heavy traffic the dashboard can be served as plain files
+instead of running Python per request. This command renders the figures
+(map, food types, ratings, reviews vs rating) and the quick stats of every
+selection with one value (or 'All') per dropdown. That is (cities + 1) x
+(food types + 1) x (rating ranges + 1) selections, of which only those
+with rows are written. Each is stored as `data/<city>__<food>__<rating>.json.gz`.
+
+The renders reuse the dashboard's own callback graph (FinalCode) and run in
+parallel across a process pool. `options.json` lists the dropdown values
+and their file slugs, and `index.html` is a thin client: it fills the
+dropdowns and loads, decompresses (unless the host already did) and
+plots the file of each selection with plotly.js. A missing file means that no restaurant matches.
+
+Rebuilds are incremental. `manifest.json` keeps a digest of each
+selection's rows: the wrapping sum of the 64-bit fingerprints of its rows
+(ingest.row_fingerprints), plus the row count. The sums of all selections
+come from one pass over the rows, into a (city, food type, rating range)
+array whose 'All' slots are totals along each axis. Only selections whose
+digest changed are rendered again. A change to the rendering code or the
+gazetteer changes the manifest token and rebuilds everything.
+
+Multi-value selections are not exported; the live dashboard serves those.
+
+Usage:
+    python static_export.py                     # export/ (incremental)
+    python static_export.py --output site --workers 8 --force
+    python -m http.server -d export             # then open http://localhost:8000
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import plotly
+import plotly.io as pio
+from plotly.offline import get_plotlyjs_version
+
+import FinalCode as dashboard
+from filter_index import RATING_RANGES
+from geo import normalize_city
+from ingest import row_fingerprints
+
+OUTPUT_DIR = 'export'
+DATA_DIR = 'data'
+ALL = 'All'
+EXPORT_VERSION = 1
+BATCH_SIZE = 32
+
+# Files whose contents decide which rows a selection has and how it is rendered
+RENDER_SOURCES = ('FinalCode.py', 'density.py', 'aggregate_cube.py', 'filter_index.py', 'callback_graph.py',
+                  'geo.py', 'gazetteer.csv', 'static_export.py')
+FIGURES = {
+    'map': 'map_figure',
+    'food_type': 'food_type_figure',
+    'rating': 'rating_figure',
+    'density': 'density_figure',
+}
+
+_worker_snapshot = None
+
+
+def render_token():
+    """Hash of the export format, the plotly version and the files the figures are rendered from."""
+    digest = hashlib.sha1(f"{EXPORT_VERSION}|{plotly.__version__}|{get_plotlyjs_version()}".encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in RENDER_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def slugs(labels):
+    """File-name slug of every label ('All' -> 'all'), made unique with a suffix."""
+    result, used = {}, set()
+    for label in labels:
+        base = normalize_city(label).replace(' ', '-') or 'blank'
+        slug, n = base, 2
+        while slug in used:
+            slug, n = f"{base}-{n}", n + 1
+        used.add(slug)
+        result[label] = slug
+    return result
+
+
+def selection_file(slug_maps, selection):
+    return '__'.join(slug_map[value] for slug_map, value in zip(slug_maps, selection)) + '.json.gz'
+
+
+def selection_digests(snapshot):
+    """Digest ('<sum>-<rows>') of every selection with rows; 'All' x 3 is always included.
+
+    Returns {(city, food_type, rating_range): digest}.
+    """
+    index = snapshot.artifacts['filter_index']
+    dims = [index.dimensions[name] for name in ('City', 'FoodType', 'RatingRange')]
+
+    # Slot 0 of each axis is 'All', 1..n the values and n + 1 missing values
+    shape = tuple(len(dim.labels) + 2 for dim in dims)
+    slots = [np.where(dim.codes >= 0, dim.codes + 1, len(dim.labels) + 1) for dim in dims]
+    cells = np.ravel_multi_index(slots, shape)
+    sums = np.zeros(np.prod(shape), dtype=np.uint64)
+    np.add.at(sums, cells, row_fingerprints(snapshot.df))
+    counts = np.bincount(cells, minlength=len(sums))
+    sums, counts = sums.reshape(shape), counts.reshape(shape)
+
+    # Fill the 'All' slots axis by axis; uint64 sums wrap, as intended
+    for axis in range(3):
+        rest = [slice(None)] * 3
+        rest[axis] = slice(1, None)
+        total = [slice(None)] * 3
+        total[axis] = 0
+        sums[tuple(total)] = sums[tuple(rest)].sum(axis=axis, dtype=np.uint64)
+        counts[tuple(total)] = counts[tuple(rest)].sum(axis=axis)
+
+    labels = [[ALL] + list(dim.labels) for dim in dims]
+    digests = {}
+    for i, j, k in zip(*np.nonzero(counts[:-1, :-1, :-1])):
+        digests[(labels[0][i], labels[1][j], labels[2][k])] = f"{sums[i, j, k]:016x}-{counts[i, j, k]}"
+    digests.setdefault((ALL, ALL, ALL), f"{0:016x}-0")
+    return digests
+
+
+def _init_worker():
+    global _worker_snapshot
+    _worker_snapshot = dashboard.dataset_store.get()
+
+
+def render_selection(snapshot, selection):
+    """Gzipped JSON of the figures and quick stats of one selection."""
+    key = dashboard.result_key(snapshot.version, *([value] for value in selection))
+    results = dashboard.dashboard_graph.run(list(FIGURES.values()) + ['aggregate'],
+                                            {'snapshot': snapshot, 'selection': key})
+    cube_slice = results['aggregate']
+    # The mean is NaN when no row of the selection is rated; JSON has no NaN
+    mean_rating = float(cube_slice.mean_rating)
+    stats = {
+        'total': cube_slice.total,
+        'mean_rating': None if np.isnan(mean_rating) else mean_rating,
+        'most_common_food_type': cube_slice.most_common_food_type,
+    }
+    # Figures are serialized once by plotly (which writes NaN as null) and
+    # spliced in, not parsed again
+    figures = ','.join(f'"{name}":{pio.to_json(results[node], validate=False)}' for name, node in FIGURES.items())
+    payload = f'{{"figures":{{{figures}}},"stats":{json.dumps(stats, allow_nan=False)}}}'
+    return gzip.compress(payload.encode('utf-8'), compresslevel=9, mtime=0)
+
+
+def render_batch(jobs, data_dir):
+    """Render and write (selection, file name) jobs; return their sizes in bytes."""
+    sizes = []
+    for selection, name in jobs:
+        data = render_selection(_worker_snapshot, selection)
+        tmp_path = os.path.join(data_dir, f"{name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(data_dir, name))
+        sizes.append((name, len(data)))
+    return sizes
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, value):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f, separators=(',', ':'), allow_nan=False)
+    os.replace(tmp_path, path)
+
+
+def export(output_dir=OUTPUT_DIR, workers=None, force=False):
+    """Render the selections whose rows changed since the last export; return the manifest."""
+    start = time.time()
+    data_dir = os.path.join(output_dir, DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+
+    snapshot = dashboard.dataset_store.get()
+    index = snapshot.artifacts['filter_index']
+    values = [[ALL] + list(index.dimensions[name].labels) for name in ('City', 'FoodType')]
+    values.append([ALL] + list(RATING_RANGES))
+    slug_maps = [slugs(labels) for labels in values]
+
+    token = render_token()
+    previous = load_manifest(output_dir)
+    reuse = {}
+    if previous and previous.get('token') == token and not force:
+        reuse = previous['selections']
+
+    selections, jobs = {}, []
+    for selection, digest in selection_digests(snapshot).items():
+        name = selection_file(slug_maps, selection)
+        entry = {'city': selection[0], 'food_type': selection[1], 'rating_range': selection[2],
+                 'digest': digest}
+        old = reuse.get(name)
+        if old and old['digest'] == digest and os.path.exists(os.path.join(data_dir, name)):
+            entry['bytes'] = old['bytes']
+        else:
+            jobs.append((selection, name))
+        selections[name] = entry
+
+    # Files of selections that no longer have rows
+    removed = 0
+    for name in os.listdir(data_dir):
+        if name not in selections:
+            os.remove(os.path.join(data_dir, name))
+            removed += 1
+
+    if jobs:
+        batches = [jobs[i:i + BATCH_SIZE] for i in range(0, len(jobs), BATCH_SIZE)]
+        # Workers forked after the dataset is loaded share it copy-on-write
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker) as pool:
+            futures = [pool.submit(render_batch, batch, data_dir) for batch in batches]
+            for future in as_completed(futures):
+                for name, size in future.result():
+                    selections[name]['bytes'] = size
+
+    # Keyed by the dropdown ids of the client page
+    options = {
+        name: [[label, slug_map[label]] for label in labels]
+        for name, labels, slug_map in zip(('city', 'food_type', 'rating_range'), values, slug_maps)
+    }
+    manifest = {
+        'version': EXPORT_VERSION,
+        'token': token,
+        'dataset_version': snapshot.version,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'selections': selections,
+    }
+    write_json(os.path.join(output_dir, 'options.json'), options)
+    write_json(os.path.join(output_dir, 'manifest.json'), manifest)
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(CLIENT_PAGE.replace('{plotly_version}', get_plotlyjs_version()))
+
+    total = sum(entry['bytes'] for entry in selections.values())
+    print(f"Exported {len(selections)} selections to {output_dir}/ in {time.time() - start:.1f}s: "
+          f"{len(jobs)} rendered, {len(selections) - len(jobs)} unchanged, {removed} removed "
+          f"({total / 1e6:.1f} MB compressed)")
+    return manifest
+
+
+CLIENT_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>FoodPanda Restaurant Analysis</title>
+<script src="https://cdn.plot.ly/plotly-{plotly_version}.min.js"></script>
+<style>
+  body { margin: 0; min-height: 100vh; padding: 1.5rem; box-sizing: border-box;
+         background: linear-gradient(165deg, #0057B7, #0098E5); color: white;
+         font-family: 'SF Pro Display', -apple-system, BlinkMacSystemFont, sans-serif; }
+  h1, h4 { font-weight: 400; letter-spacing: -0.2px; opacity: 0.9; }
+  .subtitle { opacity: 0.7; margin-bottom: 2rem; }
+  .card { background: rgba(255, 255, 255, 0.06); border: 1px solid rgba(255, 255, 255, 0.08);
+          border-radius: 20px; padding: 1rem 1.25rem; margin-bottom: 1rem; }
+  .row { display: flex; gap: 1rem; flex-wrap: wrap; }
+  .row > * { flex: 1 1 320px; }
+  select { width: 100%; padding: 0.4rem; border-radius: 10px; color: white;
+           background: rgba(255, 255, 255, 0.1); border: 1px solid rgba(255, 255, 255, 0.2); }
+  option { color: black; }
+  #message { opacity: 0.7; }
+</style>
+</head>
+<body>
+<h1>FoodPanda Restaurant Analysis</h1>
+<p class="subtitle">Interactive Dashboard for Restaurant Data Analysis</p>
+<div class="card">
+  <h4>Filters</h4>
+  <div class="row">
+    <label>City<select id="city"></select></label>
+    <label>Food Type<select id="food_type"></select></label>
+    <label>Rating<select id="rating_range"></select></label>
+  </div>
+</div>
+<p id="message"></p>
+<div class="card"><h4>Restaurant Distribution Map</h4><div id="map"></div></div>
+<div class="row">
+  <div class="card"><h4>Food Type Distribution</h4><div id="food_type_chart"></div></div>
+  <div class="card"><h4>Rating Distribution</h4><div id="rating_chart"></div></div>
+</div>
+<div class="card"><h4>Reviews vs Rating</h4><div id="density_chart"></div></div>
+<div class="card"><h4>Quick Stats</h4><div id="stats"></div></div>
+<script>
+const CHARTS = {map: 'map', food_type: 'food_type_chart', rating: 'rating_chart', density: 'density_chart'};
+const FILTERS = ['city', 'food_type', 'rating_range'];
+
+async function loadSelection() {
+  const file = FILTERS.map(id => document.getElementById(id).value).join('__') + '.json.gz';
+  const response = await fetch('data/' + file);
+  const message = document.getElementById('message');
+  if (!response.ok) {
+    message.textContent = 'No restaurants match these filters.';
+    Object.values(CHARTS).forEach(id => Plotly.purge(id));
+    document.getElementById('stats').textContent = '';
+    return;
+  }
+  message.textContent = '';
+  // Files are stored gzipped. Hosts that serve them with Content-Encoding: gzip
+  // hand over the JSON already decompressed, so only gunzip a body that still
+  // starts with the gzip magic bytes; then any static host works
+  const bytes = new Uint8Array(await response.arrayBuffer());
+  let body = new Blob([bytes]).stream();
+  if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+    body = body.pipeThrough(new DecompressionStream('gzip'));
+  }
+  const selection = await new Response(body).json();
+  for (const [name, id] of Object.entries(CHARTS)) {
+    const figure = selection.figures[name];
+    Plotly.react(id, figure.data, figure.layout, {responsive: true});
+  }
+  // The stats hold scraped text, so they are set as text, never as markup
+  const stats = selection.stats;
+  document.getElementById('stats').replaceChildren(...[
+    `Total Restaurants: ${stats.total}`,
+    `Average Rating: ${stats.mean_rating === null ? 'N/A' : stats.mean_rating.toFixed(2)}`,
+    `Most Common Food Type: ${stats.most_common_food_type || 'N/A'}`,
+  ].map(text => {
+    const line = document.createElement('h5');
+    line.textContent = text;
+    return line;
+  }));
+}
+
+fetch('options.json').then(response => response.json()).then(options => {
+  for (const id of FILTERS) {
+    const select = document.getElementById(id);
+    for (const [label, slug] of options[id]) {
+      select.add(new Option(label, slug));
+    }
+    select.addEventListener('change', loadSelection);
+  }
+  loadSelection();
+});
+</script>
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the dashboard as static files for every filter selection')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='output directory')
+    parser.add_argument('--workers', type=int, help='worker processes (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='render every selection, even unchanged ones')
+    args = parser.parse_args()
+    export(args.output, args.workers, args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Dashboard callbacks on the bundled FoodpandaCombo.csv.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import FinalCode
+from filter_index import FilterIndex
+from ingest import apply_upserts
+from name_search import NameIndex
+
+
+def test_food_type_distribution_of_no_restaurants():
+    fig = FinalCode.create_food_type_distribution(pd.Series([], dtype='int64'))
+    assert isinstance(fig, go.Figure)
+    assert len(fig.data) == 0
+    assert fig.layout.annotations[0].text == 'No restaurants match these filters'
+
+
+def test_update_dashboard_with_an_empty_selection():
+    # No pizza place in Bacoor Cavite is rated below 3.5
+    city, food_type, rating_range = ['Bacoor Cavite'], ['Pizza'], ['Below 3.5']
+    snapshot = FinalCode.dataset_store.get()
+    rows = snapshot.artifacts['filter_index'].rows(city, food_type, rating_range)
+    assert rows is not None and len(rows) == 0
+
+    *figures, stats, key = FinalCode.update_dashboard(city, food_type, rating_range)
+    assert all(isinstance(fig, go.Figure) for fig in figures)
+    assert 'Total Restaurants: 0' in str(stats)
+    assert 'Average Rating: N/A' in str(stats)
+    assert key['filters'] == [['Bacoor Cavite'], ['Pizza'], ['Below 3.5']]
+
+
+def test_appended_rows_update_the_indexes_like_a_rebuild():
+    df = FinalCode.dataset_store.get().df
+    # Changed copies of some stores plus stores in a city not seen before
+    changed = df.iloc[::50].assign(CompleteStoreName='Sulit Shawarma', AverageRating=4.8)
+    new = df.iloc[:20].assign(StoreId=[f'new-{i}' for i in range(20)], City='Zamboanga City')
+    delta = FinalCode.clean_data(pd.concat([changed, new]).astype({'City': str, 'FoodType': str}))
+    new_df, removed = apply_upserts(df, delta)
+    assert len(new_df) == len(df) - len(removed) + len(delta)
+
+    filter_index = FilterIndex(df).updated(delta, removed)
+    rebuilt = FilterIndex(new_df)
+    for selection in [('Zamboanga City', None, None), (None, 'Pizza', ['4.5+', '4.0-4.4']), ('Manila', None, None)]:
+        assert np.array_equal(filter_index.rows(*selection), rebuilt.rows(*selection))
+    assert filter_index.present_values() == rebuilt.present_values()
+
+    name_index = NameIndex(df).updated(delta, removed)
+    rebuilt_names = NameIndex(new_df)
+    for query in ['sulit shawarma', 'shawarma', 'sulit shwarma', 'jollibee', 'su']:
+        result, expected = name_index.search(query), rebuilt_names.search(query)
+        assert np.array_equal(result.rows, expected.rows)
+        assert np.allclose(result.scores, expected.scores)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Snapshot ingestion into a store written by merge_csv.py.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import os
+
+import pandas as pd
+
+from data_loader import load_restaurants
+from ingest import latest_rows, upsert_snapshot
+from merge_csv import SOURCES, merge
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _rows(store):
+    # What the dashboard loads (FinalCode.read_and_clean)
+    return latest_rows(load_restaurants(str(store)))
+
+
+def test_reingesting_a_merged_snapshot_appends_nothing(tmp_path):
+    sources = [os.path.join(HERE, source) for source in SOURCES]
+    store = tmp_path / 'FoodpandaCombo.csv'
+    merge(sources, output=store)
+    rows = len(_rows(store))
+
+    for source in sources:
+        delta = upsert_snapshot(source, store=str(store))
+        assert len(delta) == 0
+    assert len(_rows(store)) == rows
+
+
+def test_ingest_appends_only_new_and_changed_rows(tmp_path):
+    source = os.path.join(HERE, SOURCES[1])
+    store = tmp_path / 'FoodpandaCombo.csv'
+    merge([source], output=store)
+    rows = len(_rows(store))
+
+    snapshot = pd.read_csv(source)
+    snapshot.loc[0, 'AverageRating'] = 1.0
+    snapshot.loc[len(snapshot)] = ['new-1', 'New Pizza Place - Manila', 'Pizza', 4.5, 12, 'manila']
+    snapshot.to_csv(tmp_path / 'next.csv', index=False)
+
+    delta = upsert_snapshot(str(tmp_path / 'next.csv'), store=str(store))
+    assert sorted(delta['StoreId']) == sorted(['new-1', snapshot.loc[0, 'StoreId']])
+    df = _rows(store)
+    assert len(df) == rows + 1
+    assert df.loc[df['StoreId'] == snapshot.loc[0, 'StoreId'], 'AverageRating'].tolist() == [1.0]
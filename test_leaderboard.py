@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Confidence-weighted leaderboards against a brute-force ranking.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+from leaderboard import Leaderboard, bayesian_score
+
+
+def _restaurants(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'CompleteStoreName': [f'Store {i}' for i in range(n)],
+        'City': pd.Categorical(rng.choice(['Manila', 'Makati City', 'Pasay City', 'Cebu City'], n)),
+        'FoodType': pd.Categorical(rng.choice(['Pizza', 'Coffee', 'Filipino', 'Desserts', 'Chinese'], n)),
+        'AverageRating': rng.uniform(2.5, 5.0, n).astype('float32'),
+        'Reviewers': rng.integers(0, 3000, n).astype('uint16'),
+    })
+
+
+def test_many_good_reviews_beat_a_few_perfect_ones():
+    df = pd.DataFrame({
+        'CompleteStoreName': ['Few reviews', 'Busy', 'Unrated', 'Too few', 'Average'],
+        'City': pd.Categorical(['Manila'] * 5),
+        'FoodType': pd.Categorical(['Pizza'] * 5),
+        'AverageRating': np.array([5.0, 4.7, np.nan, 5.0, 4.0], dtype='float32'),
+        'Reviewers': np.array([12, 2000, 500, 3, 800], dtype='uint16'),
+    })
+    board = Leaderboard(df)
+    top = board.top_restaurants(k=10)
+
+    assert top['Restaurant'].tolist() == ['Busy', 'Few reviews', 'Average']
+    reviewed = df['AverageRating'].notna() & (df['Reviewers'] > 0)
+    prior_mean = np.average(df.loc[reviewed, 'AverageRating'], weights=df.loc[reviewed, 'Reviewers'])
+    assert board.prior_mean == pytest.approx(prior_mean)
+    assert board.prior_weight == np.median(df.loc[reviewed, 'Reviewers'])
+    expected = bayesian_score(top['AverageRating'], top['Reviewers'], board.prior_mean, board.prior_weight)
+    assert np.allclose(top['Score'], expected)
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'city': 'Manila'},
+    {'city': ['Manila', 'Cebu City'], 'food_type': 'Pizza'},
+    {'food_type': 'Desserts', 'rating_range': '4.5+'},
+    # Small enough to be ranked directly instead of walking the order
+    {'city': 'Manila', 'food_type': 'Desserts', 'rating_range': '4.5+'},
+])
+def test_top_rows_match_a_full_sort(filters):
+    df = _restaurants(20_000)
+    board, filter_index = Leaderboard(df), FilterIndex(df)
+    rows = filter_index.rows(**filters)
+    rows = np.arange(len(df)) if rows is None else rows
+    rows = rows[df['Reviewers'].to_numpy()[rows] >= 10]
+    expected = np.sort(board.scores[rows])[::-1][:25]
+
+    top = board.top_rows(25, filter_index=filter_index, **filters)
+    assert np.array_equal(board.scores[top], expected)
+
+
+def test_top_groups_total_the_reviews_of_each_group():
+    df = _restaurants(5_000)
+    board = Leaderboard(df)
+    top = board.top_groups('City', k=2, filter_index=FilterIndex(df), food_type='Coffee')
+
+    coffee = df[(df['FoodType'] == 'Coffee') & (df['Reviewers'] >= 10)]
+    reviewers = coffee['Reviewers'].astype('float64')
+    totals = pd.DataFrame({'City': coffee['City'].astype(str), 'Reviewers': reviewers,
+                           'Weighted': coffee['AverageRating'].astype('float64') * reviewers})
+    totals = totals.groupby('City').sum()
+    scores = (totals['Weighted'] + board.prior_mean * board.prior_weight) / (totals['Reviewers'] + board.prior_weight)
+    expected = scores.sort_values(ascending=False)[:2]
+
+    assert top['City'].tolist() == expected.index.tolist()
+    assert np.allclose(top['Score'], expected.to_numpy())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Streaming merge against the in-memory merge of the bundled source files.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import os
+
+import pandas as pd
+
+from merge_csv import SOURCES, merge, stream_merge
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_stream_merge_writes_the_same_file_as_merge(tmp_path):
+    sources = [os.path.join(HERE, source) for source in SOURCES]
+    merge(sources, output=tmp_path / 'merged.csv')
+    stream_merge(sources, output=tmp_path / 'streamed.csv', chunksize=1000)
+    assert (tmp_path / 'streamed.csv').read_bytes() == (tmp_path / 'merged.csv').read_bytes()
+
+
+def test_stream_merge_keeps_rows_without_a_key(tmp_path):
+    pd.DataFrame({'StoreId': [None, None, None, 'a', 'a'],
+                  'FoodType': ['Pizza', 'Cafe', 'Pizza', 'Pizza', 'Cafe'],
+                  'City': ['manila'] * 5}).to_csv(tmp_path / 'source.csv', index=False)
+    written = stream_merge([tmp_path / 'source.csv'], output=tmp_path / 'out.csv', chunksize=2, key='StoreId')
+    out = pd.read_csv(tmp_path / 'out.csv')
+    assert written == 3
+    assert out['StoreId'].isna().sum() == 2
+    assert out['FoodType'].tolist() == ['Pizza', 'Cafe', 'Pizza']
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Restaurant name search: typo matching, ranking and incremental updates.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import numpy as np
+import pandas as pd
+
+from filter_index import FilterIndex
+from name_search import NameIndex
+
+
+def _restaurants(rows):
+    return pd.DataFrame(rows, columns=['StoreId', 'CompleteStoreName', 'AverageRating', 'City', 'FoodType'])
+
+
+RESTAURANTS = _restaurants([
+    ['a', 'Sulit Shawarma! - Paseo de Bacoor', 4.7, 'Bacoor Cavite', 'Middle Eastern'],
+    ['b', 'Bagwings - Bacoor Blvd', 4.2, 'Bacoor Cavite', 'Chicken Wings'],
+    ['c', 'Mangguo - Bacoor', 4.9, 'Bacoor Cavite', 'Desserts'],
+    ['d', 'Jollibee - Manila', 4.5, 'Manila', 'Fast Food'],
+    ['e', 'Jollibee - Manila', 4.8, 'Manila', 'Fast Food'],
+    ['f', 'Café Señorita', 4.1, 'Manila', 'Cafe'],
+])
+
+
+def _names(index, result):
+    return RESTAURANTS['StoreId'].to_numpy()[result.rows].tolist()
+
+
+def test_words_match_anywhere_in_the_name():
+    index = NameIndex(RESTAURANTS)
+    assert _names(index, index.search('shawarma')) == ['a']
+    assert set(_names(index, index.search('bacoor'))) == {'a', 'b', 'c'}
+    # Prefix of a word, and accents are ignored
+    assert _names(index, index.search('senor')) == ['f']
+    assert _names(index, index.search('cafe senorita')) == ['f']
+
+
+def test_typos_are_found_but_rank_below_exact_matches():
+    index = NameIndex(RESTAURANTS)
+    assert _names(index, index.search('sulit shwarma')) == ['a']
+    assert _names(index, index.search('jolibee', max_typos=1))[:2] == ['e', 'd']
+    assert len(index.search('jolibee', max_typos=0)) == 0
+
+    exact, typo = index.search('bagwings'), index.search('bagwngs')
+    assert _names(index, exact) == _names(index, typo) == ['b']
+    assert exact.scores[0] > typo.scores[0]
+
+
+def test_ties_are_ranked_by_similarity_then_rating():
+    index = NameIndex(RESTAURANTS)
+    # Every name contains the word, so the shortest names come first
+    assert _names(index, index.search('bacoor')) == ['c', 'b', 'a']
+    # Same name: the better rated restaurant first
+    assert _names(index, index.search('jollibee manila')) == ['e', 'd']
+
+
+def test_search_follows_the_filters():
+    index, filters = NameIndex(RESTAURANTS), FilterIndex(RESTAURANTS)
+    result = index.search('bacoor', filter_index=filters, food_type='Desserts')
+    assert _names(index, result) == ['c']
+
+
+def test_updated_index_matches_a_rebuild():
+    index = NameIndex(RESTAURANTS)
+    # Replace two stores (one renamed) and add a new one
+    added = _restaurants([
+        ['b', 'Bagwings Express - Bacoor', 4.4, 'Bacoor Cavite', 'Chicken Wings'],
+        ['d', 'Jollibee - Manila', 3.9, 'Manila', 'Fast Food'],
+        ['g', 'Shawarma Shack - Manila', 4.6, 'Manila', 'Middle Eastern'],
+    ])
+    superseded = RESTAURANTS['StoreId'].isin(added['StoreId']).to_numpy()
+    removed = RESTAURANTS[superseded].set_axis(np.flatnonzero(superseded))
+    new_df = pd.concat([RESTAURANTS[~superseded], added], ignore_index=True)
+
+    updated, rebuilt = index.updated(added, removed), NameIndex(new_df)
+    for query in ['shawarma', 'bagwings', 'bagwngs express', 'jollibee', 'bacoor', 'ma', 'zzz']:
+        for max_typos in (0, 1):
+            result, expected = updated.search(query, max_typos=max_typos), rebuilt.search(query, max_typos=max_typos)
+            assert result.rows.tolist() == expected.rows.tolist(), query
+            assert np.allclose(result.scores, expected.scores), query
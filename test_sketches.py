@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Error bounds of the streaming sketches on seeded data.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import numpy as np
+import pandas as pd
+
+from sketches import HyperLogLog, KLLSketch, SpaceSaving
+
+
+def test_kll_quantiles_stay_within_the_rank_error():
+    epsilon = 0.01
+    values = np.random.default_rng(0).lognormal(3, 1.5, 200_000)
+    left, right = KLLSketch.for_error(epsilon, seed=1), KLLSketch.for_error(epsilon, seed=2)
+    for i, chunk in enumerate(np.array_split(values, 20)):
+        (left if i % 2 else right).update(chunk)
+    sketch = left.merge(right)
+
+    assert sketch.n == len(values)
+    ordered = np.sort(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99):
+        rank = np.searchsorted(ordered, sketch.quantile(q), side='right') / len(values)
+        assert abs(rank - q) <= epsilon, q
+    assert sketch.quantile(0) == values.min()
+    assert sketch.quantile(1) == values.max()
+    # Memory stays O(k), not O(n)
+    assert sum(len(level) for level in sketch.levels) < 10 * sketch.k
+
+
+def test_hyperloglog_counts_within_its_relative_error():
+    epsilon = 0.02
+    rng = np.random.default_rng(0)
+    for distinct in (100, 5_000, 200_000):
+        values = pd.Series(rng.integers(0, distinct, 3 * distinct)).map('store-{}'.format)
+        truth = values.nunique()
+        whole, left, right = (HyperLogLog.for_error(epsilon) for _ in range(3))
+        whole.update(values)
+        left.update(values[::2])
+        right.update(values[1::2])
+
+        assert abs(whole.count() - truth) <= 3 * epsilon * truth, distinct
+        # Merging is exact: the same registers as one sketch over everything
+        assert left.merge(right).count() == whole.count()
+
+
+def test_space_saving_over_estimates_by_at_most_rows_over_capacity():
+    rng = np.random.default_rng(0)
+    parts = [pd.Series(rng.zipf(1.3, 50_000) % 5_000) for _ in range(2)]
+    summaries = []
+    for part in parts:
+        summary = SpaceSaving(capacity=100)
+        for chunk in np.array_split(part, 10):
+            summary.update(chunk)
+        summaries.append(summary)
+    merged = summaries[0].merge(summaries[1])
+
+    truth = pd.concat(parts).value_counts()
+    bound = sum(len(part) for part in parts) / merged.capacity
+    for value, count in merged.counts.items():
+        assert truth.get(value, 0) <= count <= truth.get(value, 0) + bound
+        assert count - merged.errors[value] <= truth.get(value, 0)
+    # Every value more frequent than the bound is kept, and the top ones in order
+    assert set(truth[truth > bound].index) <= set(merged.counts)
+    assert merged.top(5).index.tolist() == truth.index[:5].tolist()
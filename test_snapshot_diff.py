@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+StoreId diff between two scrape snapshots.
+
+Run with `python -m pytest` from the repository root.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from snapshot_diff import SOURCES, UNKNOWN, diff_files, diff_snapshots, summarize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _snapshot(rows):
+    return pd.DataFrame(rows, columns=['StoreId', 'CompleteStoreName', 'FoodType', 'AverageRating',
+                                       'Reviewers', 'City'], dtype=str)
+
+
+def test_stores_without_a_food_type_are_still_matched():
+    old = _snapshot([['a', 'Sulit Shawarma', 'Middle Eastern', '4.5', '(100+)', 'manila'],
+                     ['b', 'Lugaw Juan', 'Filipino', '4.0', '(10)', 'manila']])
+    new = _snapshot([['a', 'Sulit Shawarma', None, '4.7', '150', 'Manila'],
+                     ['c', 'Pizza Place', None, '0', '0', 'Manila']])
+    changes = diff_snapshots(old, new).set_index('StoreId')
+
+    assert changes['Status'].to_dict() == {'a': 'kept', 'b': 'closed', 'c': 'opened'}
+    assert changes.loc['a', 'FoodType'] == UNKNOWN
+    assert changes.loc['a', 'RatingDelta'] == pytest.approx(0.2)
+    assert changes.loc['a', 'ReviewersDelta'] == 50
+
+    by_food_type = summarize(changes.reset_index(), 'FoodType')
+    assert by_food_type.loc[UNKNOWN, ['Before', 'After', 'Opened']].tolist() == [1, 2, 1]
+    assert by_food_type['After'].sum() == 2
+
+
+def test_partitioned_diff_equals_the_in_memory_diff(tmp_path):
+    old, new = (os.path.join(HERE, source) for source in SOURCES)
+    in_memory = diff_files(old, new, output=tmp_path / 'one')
+    partitioned = diff_files(old, new, output=tmp_path / 'many', partitions=7, chunksize=1000, workdir=tmp_path)
+
+    for by in in_memory:
+        pd.testing.assert_frame_equal(partitioned[by], in_memory[by])
+    changes = [pd.read_csv(tmp_path / name / 'changes.csv').sort_values('StoreId', ignore_index=True)
+               for name in ('one', 'many')]
+    pd.testing.assert_frame_equal(changes[1], changes[0])
+    assert len(changes[0]) == changes[0]['StoreId'].nunique()
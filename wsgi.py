@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Production WSGI entry point for the InsightPlate dashboard.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+`server` is the Flask server behind the Dash app. With `preload_app` (set
+in gunicorn.conf.py) this module is imported once in the gunicorn master:
+the dataset and its indexes are built there and the workers are forked
+from it. Their pages are then shared copy-on-write, so adding workers adds
+throughput without adding copies of the frame.
+"""
+
+import gc
+
+from FinalCode import after_fork, app, dataset_store, warm_up
+
+# Load the cleaned dataset, build its filter index, cube and coordinates and
+# render the default view before any worker is forked; /ready then answers 200
+warm_up()
+
+# Keep the collector from touching the preloaded objects; writing to their
+# headers would copy their pages into every worker
+gc.freeze()
+
+server = app.server
+application = server
+
+# dataset_store and after_fork are re-exported for the hooks in gunicorn.conf.py
+__all__ = ['after_fork', 'application', 'dataset_store', 'server', 'warm_up']